@@ -0,0 +1,128 @@
+"""Compact, typed records for osu! API responses.
+
+The v1 API returns everything as strings, so every caller used to `int()` and `float()` the
+same fields over and over again. Responses are instead parsed once, right where they come in
+(see `osuapi.api_get()`), into namedtuples - these are much smaller than the equivalent dicts,
+which adds up over the thousands of scores handled during a rebuild.
+
+Only the fields the bot actually uses are kept. Fields the API can leave out or null (like
+`max_combo` for some modes) are `None`.
+
+JSON is decoded with `orjson` if it's installed, and the standard library otherwise.
+"""
+import collections
+import itertools
+import json
+import operator
+import numpy as np
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+def _parse(model, fields, data):
+    """Make a `model` from the dict `data`, converting each field with its converter in `fields`.
+
+    Works on raw API responses (all strings) as well as on `_asdict()`s of already-parsed records."""
+    return model(*[None if data.get(name) is None else convert(data[name]) for name, convert in fields])
+
+user_fields = (
+    ("user_id", str),
+    ("username", str),
+    ("country", str),
+    ("pp_rank", int),
+    ("pp_country_rank", int),
+    ("pp_raw", float),
+    ("accuracy", float),
+    ("level", float),
+    ("playcount", int),
+)
+User = collections.namedtuple("User", [name for name, _ in user_fields])
+
+beatmap_fields = (
+    ("beatmap_id", str),
+    ("beatmapset_id", str),
+    #kept as a str since it's a status code, see `beatmap_cache.settled_statuses`
+    ("approved", str),
+    ("artist", str),
+    ("title", str),
+    ("version", str),
+    ("creator", str),
+    ("mode", str),
+    ("difficultyrating", float),
+    ("bpm", float),
+    ("total_length", int),
+    ("hit_length", int),
+    ("max_combo", int),
+)
+Beatmap = collections.namedtuple("Beatmap", [name for name, _ in beatmap_fields])
+
+#`pass` is a keyword, so that field is called `passed`
+Score = collections.namedtuple("Score", ["user_id", "team", "score", "maxcombo", "count300", "count100", "count50",
+                                         "countmiss", "passed"])
+
+Game = collections.namedtuple("Game", ["game_id", "start_time", "end_time", "beatmap_id", "play_mode",
+                                       "match_type", "scoring_type", "team_type", "mods", "scores"])
+Match = collections.namedtuple("Match", ["match_id", "name", "start_time", "end_time", "games"])
+
+def parse_user(data):
+    return _parse(User, user_fields, data)
+
+def parse_users(data):
+    return [parse_user(user) for user in data]
+
+def parse_beatmap(data):
+    return _parse(Beatmap, beatmap_fields, data)
+
+def parse_beatmaps(data):
+    return [parse_beatmap(beatmap) for beatmap in data]
+
+#numeric fields of a get_match score, in the order they appear in `Score`
+_score_ints = operator.itemgetter("team", "score", "maxcombo", "count300", "count100", "count50", "countmiss")
+
+def parse_scores(scores):
+    """Parse a list of get_match score dicts into a list of `Score`.
+
+    There's one score per player per game, so this is the bulk of parsing a match. All of the
+    numeric fields are parsed by numpy in one go, which is much faster than `int()`-ing each one."""
+    if not scores:
+        return []
+    text = " ".join([" ".join(_score_ints(score)) for score in scores])
+    columns = np.fromstring(text, dtype=np.int64, sep=" ").reshape(-1, 7).T.tolist()
+    return list(map(Score._make, zip([score["user_id"] for score in scores], *columns,
+                                     [score["pass"] == "1" for score in scores])))
+
+def parse_game(data, scores=None):
+    """Parse a get_match game. Game type codes (`play_mode`, `team_type`, etc.) are kept as `str`.
+
+    `scores` are the already-parsed scores of the game, if available."""
+    return Game(
+        game_id=data["game_id"],
+        start_time=data["start_time"],
+        end_time=data["end_time"],
+        beatmap_id=data["beatmap_id"],
+        play_mode=data["play_mode"],
+        match_type=data["match_type"],
+        scoring_type=data["scoring_type"],
+        team_type=data["team_type"],
+        mods=int(data["mods"]) if data["mods"] is not None else 0,
+        scores=tuple(scores if scores is not None else parse_scores(data["scores"]))
+    )
+
+def parse_match(data):
+    """Parse a full get_match response.
+
+    The api returns `{"match": 0, "games": []}` for matches that don't exist; those are parsed to a
+    `Match` with everything but `games` (which is empty) set to `None`."""
+    match = data["match"] or {}
+    #every score in the match is parsed at once, then split back up by game
+    scores = iter(parse_scores([score for game in data["games"] for score in game["scores"]]))
+    return Match(
+        match_id=match.get("match_id"),
+        name=match.get("name"),
+        start_time=match.get("start_time"),
+        end_time=match.get("end_time"),
+        games=tuple(parse_game(game, itertools.islice(scores, len(game["scores"]))) for game in data["games"])
+    )
@@ -0,0 +1,106 @@
+"""Read-through cache for beatmap metadata returned by the osu! API's get_beatmaps endpoint.
+
+There are two tiers:
+- an in-memory LRU, which is lost whenever the dyno restarts
+- the `osu_cache.beatmaps` collection, which survives restarts (and rebuilds, since
+`rebuild_all` doesn't drop the `osu_cache` database)
+
+Ranked, approved and loved maps can't change, so they're kept for a long time. Anything
+else (pending, WIP, graveyard, qualified) can still be updated by its mapper and expires
+after a much shorter TTL.
+
+`osu_cache.beatmaps` documents have the following fields:
+{
+    _id: str (diff id)
+    data: {...} #the `apimodels.Beatmap` of this diff, as a dict
+    expires_at: double (unix timestamp)
+}
+"""
+import time
+import os
+import cachetools
+
+import db_get
+import apimodels
+
+#approved statuses that can no longer change: ranked, approved, loved
+#(qualified maps can still be disqualified and updated)
+settled_statuses = ("1", "2", "4")
+
+ranked_ttl = int(os.getenv("map_cache_ranked_ttl", 60*60*24*30))
+unranked_ttl = int(os.getenv("map_cache_unranked_ttl", 60*60*6))
+
+_memory = cachetools.LRUCache(maxsize=int(os.getenv("map_cache_size", 512)))
+
+stats = {
+    "memory_hits": 0,
+    "durable_hits": 0,
+    "misses": 0,
+    "expired": 0,
+    "durable_errors": 0,
+}
+
+def _collection():
+    return db_get.client['osu_cache']['beatmaps']
+
+def ttl_for(map_data):
+    """Returns the number of seconds `map_data` should be cached for."""
+    if map_data.approved in settled_statuses:
+        return ranked_ttl
+    return unranked_ttl
+
+async def get(diff_id):
+    """Get the cached `apimodels.Beatmap` of `diff_id`, or `None` on a miss.
+
+    A durable hit is promoted to the in-memory tier."""
+    diff_id = str(diff_id)
+    now = time.time()
+
+    entry = _memory.get(diff_id)
+    if entry is not None:
+        expires_at, map_data = entry
+        if expires_at > now:
+            stats["memory_hits"] += 1
+            return map_data
+        stats["expired"] += 1
+        _memory.pop(diff_id, None)
+
+    try:
+        document = await _collection().find_one({'_id': diff_id, 'expires_at': {'$gt': now}})
+    except Exception as e:
+        #the cache should never be the reason a command fails
+        stats["durable_errors"] += 1
+        print(f"beatmap cache lookup for {diff_id} failed: {e}")
+        document = None
+    if document is not None:
+        stats["durable_hits"] += 1
+        #documents written before beatmaps were parsed hold the raw response, which parses just the same
+        map_data = apimodels.parse_beatmap(document["data"])
+        _memory[diff_id] = (document["expires_at"], map_data)
+        return map_data
+
+    stats["misses"] += 1
+    return None
+
+async def put(diff_id, map_data):
+    """Store `map_data` (an `apimodels.Beatmap`) in both tiers."""
+    diff_id = str(diff_id)
+    expires_at = time.time() + ttl_for(map_data)
+    _memory[diff_id] = (expires_at, map_data)
+    try:
+        await _collection().replace_one({'_id': diff_id},
+                                        {'_id': diff_id, 'data': map_data._asdict(), 'expires_at': expires_at},
+                                        upsert=True)
+    except Exception as e:
+        stats["durable_errors"] += 1
+        print(f"beatmap cache write for {diff_id} failed: {e}")
+
+def get_stats():
+    """Returns a copy of the hit/miss counters, plus the hit rate and in-memory size."""
+    lookups = stats["memory_hits"] + stats["durable_hits"] + stats["misses"]
+    hits = stats["memory_hits"] + stats["durable_hits"]
+    return {
+        **stats,
+        "hit_rate": hits/lookups if lookups else 0.0,
+        "memory_size": len(_memory),
+    }
@@ -0,0 +1,77 @@
+"""Benchmark of `db_get.get_best_user_score()` against the three queries it replaced.
+
+This only reads from the database at `db_url`, so it can be pointed at a copy of the real one.
+Pairs of (map, player) are sampled from the existing scores, both implementations are checked to
+give the same results for every pair, and then each is timed over all of them:
+
+    python src/bench_best_user_score.py --pairs 50 --repeat 5
+
+`multi_query()` is the old `get_best_user_score()`: a `find_one()` for the best score, then a
+`count_documents()` each for the player's extra scores and for the rank. (The player and map
+lookups are cached by both, so after the first pass only the score queries are measured.)
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import db_get
+
+async def multi_query(map_id, player):
+    """The pre-aggregation `get_best_user_score()`."""
+    map_document = await db_get.get_map_document(map_id)
+    if not map_document:
+        return (None, None, None)
+    player_document = await db_get.get_player_document(player)
+    if not player_document:
+        return (None, None, None)
+
+    score_collection = db_get.client['matches_and_scores']['scores']
+    highest_score_doc = await score_collection.find_one({'user_id': player_document["_id"], 'diff_id': map_document["_id"]}, sort=[("score", -1)])
+    if not highest_score_doc:
+        return (None, 0, 0)
+    extra_count = (await score_collection.count_documents({'user_id': player_document["_id"], 'diff_id': map_document["_id"]}))-1
+    rank = (await score_collection.count_documents({'diff_id': map_document["_id"], 'score': {"$gt": highest_score_doc["score"]}}))+1
+    return (highest_score_doc, rank, extra_count)
+
+async def sample_pairs(count):
+    """Up to `count` random (diff_id, user_id) pairs that have at least one score."""
+    cursor = db_get.client['matches_and_scores']['scores'].aggregate([
+        {'$sample': {'size': count}},
+        {'$project': {'_id': 0, 'diff_id': 1, 'user_id': 1}}
+    ])
+    return [(score["diff_id"], score["user_id"]) for score in await cursor.to_list(length=count)]
+
+async def timed(func, pairs, repeat):
+    """Call `func()` on every pair, `repeat` times; returns the median time per call in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for map_id, player in pairs:
+            await func(map_id, player)
+        times.append((time.perf_counter()-start)/len(pairs))
+    return statistics.median(times)
+
+async def run(args):
+    pairs = await sample_pairs(args.pairs)
+    if not pairs:
+        raise SystemExit("There are no scores to sample from!")
+    for map_id, player in pairs:
+        if await multi_query(map_id, player) != await db_get.get_best_user_score(map_id, player):
+            raise SystemExit(f"get_best_user_score() and the old queries disagree on map {map_id}, player {player}!")
+
+    old_time = await timed(multi_query, pairs, args.repeat)
+    new_time = await timed(db_get.get_best_user_score, pairs, args.repeat)
+    print(f"{len(pairs)} (map, player) pairs (median of {args.repeat} runs, results identical)")
+    print(f"three queries:         {old_time*1000:8.2f}ms/call")
+    print(f"get_best_user_score(): {new_time*1000:8.2f}ms/call ({old_time/new_time:.2f}x)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark get_best_user_score() against the old queries.")
+    parser.add_argument("--pairs", type=int, default=50, help="(map, player) pairs to sample")
+    parser.add_argument("--repeat", type=int, default=5, help="runs over every pair (the median is shown)")
+    args = parser.parse_args(argv)
+    asyncio.get_event_loop().run_until_complete(run(args))
+
+if __name__ == "__main__":
+    main()
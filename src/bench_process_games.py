@@ -0,0 +1,142 @@
+"""Benchmark of `osuapi.process_games()` against the per-score loop it replaced.
+
+Both crunch the same synthetic match (generated by fake_osuapi.py and parsed with `apimodels`,
+so neither side pays for parsing), and their results are checked to be identical before timing:
+
+    python src/bench_process_games.py --games 300 --team-size 8 --repeat 20
+
+`per_score_loop()` is the old `process_game()`, one game at a time and one score at a time,
+adapted to take `apimodels` records instead of raw dicts.
+"""
+import argparse
+import statistics
+import time
+
+import apimodels
+import fake_osuapi
+import osuapi
+
+def per_score_loop(match_id, match_data, game_data, map_data, player_ids, *, ignore_threshold=1000, ignore_player_ids=[]):
+    """The pre-numpy `process_game()`."""
+    if not game_data.scores:
+        return None
+    if game_data.team_type not in ('2', '3'):
+        return None
+
+    team_1_players = []
+    team_2_players = []
+    team_1_score = 0
+    team_2_score = 0
+    for player_score in game_data.scores:
+        if player_score.score < ignore_threshold or player_score.user_id in ignore_player_ids:
+            continue
+        if player_score.team == 1:
+            team_1_players.append(player_score.user_id)
+            team_1_score += player_score.score
+        if player_score.team == 2:
+            team_2_players.append(player_score.user_id)
+            team_2_score += player_score.score
+
+    if team_1_score != team_2_score:
+        winner = "Blue" if team_1_score > team_2_score else "Red"
+    else:
+        winner = "Tie"
+    score_diff = abs(team_1_score-team_2_score)
+
+    individual_scores = []
+    for player_score in game_data.scores:
+        if player_score.score < ignore_threshold or player_score.user_id in ignore_player_ids:
+            continue
+        count_300 = player_score.count300
+        count_100 = player_score.count100
+        count_50 = player_score.count50
+        count_miss = player_score.countmiss
+        acc_count = count_300 + count_100 + count_50 + count_miss
+        acc_value = (count_300+(count_100/3)+(count_50/6))/acc_count
+        score = player_score.score
+        contrib = score/team_1_score if player_score.team == 1 else score/team_2_score
+        player_name, team_name = player_ids[player_score.user_id]
+        individual_scores.append({
+            "user_id": player_score.user_id,
+            "user_name": player_name,
+            "score": score,
+            "combo": player_score.maxcombo,
+            "accuracy": acc_value,
+            "mod_val": game_data.mods,
+            "mods": osuapi.Mods(game_data.mods).to_list(),
+            "pass": "1" if player_score.passed else "0",
+            "hits": {
+                "300_count": count_300,
+                "100_count": count_100,
+                "50_count": count_50,
+                "miss_count": count_miss
+            },
+            "team_contrib": contrib,
+            "team": str(player_score.team),
+            "team_name": team_name
+        })
+    return {
+        "match_name": match_data.name,
+        "match_id": match_id,
+        "match_url": f'https://osu.ppy.sh/community/matches/{match_id}',
+        "diff_id": game_data.beatmap_id,
+        "diff_url": f'https://osu.ppy.sh/b/{game_data.beatmap_id}',
+        "map_thumbnail": f'https://b.ppy.sh/thumb/{map_data.beatmapset_id}l.jpg',
+        "map_name": f'{map_data.artist} - {map_data.title} [{map_data.version}]',
+        "winner": winner,
+        "score_difference": score_diff,
+        "team_1_score": team_1_score,
+        "team_2_score": team_2_score,
+        "team_1_score_avg": round(team_1_score/len(team_1_players),2) if len(team_1_players) != 0 else 0,
+        "team_2_score_avg": round(team_2_score/len(team_2_players),2) if len(team_2_players) != 0 else 0,
+        "individual_scores": individual_scores,
+        "start_time": game_data.start_time,
+        "scoring_type": game_data.scoring_type,
+        "team_type": game_data.team_type,
+        "play_mode": game_data.play_mode,
+        "player_ids": player_ids
+    }
+
+def make_match(games, team_size):
+    """A parsed synthetic match, and the beatmaps and players it needs."""
+    match_data = apimodels.parse_match(fake_osuapi.synthetic_match("1", games=games, team_size=team_size))
+    map_data = {game.beatmap_id: apimodels.parse_beatmaps(fake_osuapi.synthetic_beatmap(game.beatmap_id))[0]
+                for game in match_data.games}
+    player_ids = {score.user_id: [f"player{score.user_id}", f"team{score.team}"]
+                  for game in match_data.games for score in game.scores}
+    return match_data, map_data, player_ids
+
+def timed(func, repeat):
+    """Run `func()` `repeat` times; returns the median time in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter()-start)
+    return statistics.median(times)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark process_games() against the old per-score loop.")
+    parser.add_argument("--games", type=int, default=300, help="games in the match")
+    parser.add_argument("--team-size", type=int, default=8, help="players per team")
+    parser.add_argument("--repeat", type=int, default=20, help="runs of each implementation (the median is shown)")
+    args = parser.parse_args(argv)
+
+    match_data, map_data, player_ids = make_match(args.games, args.team_size)
+    games = list(match_data.games)
+    def old():
+        return [per_score_loop("1", match_data, game, map_data[game.beatmap_id], player_ids) for game in games]
+    def new():
+        return osuapi.process_games("1", match_data, games, map_data, player_ids)
+    if old() != new():
+        raise SystemExit("process_games() and the per-score loop disagree!")
+
+    scores = sum(len(game.scores) for game in games)
+    old_time = timed(old, args.repeat)
+    new_time = timed(new, args.repeat)
+    print(f"{len(games)} games, {scores} scores (median of {args.repeat} runs, results identical)")
+    print(f"per-score loop:  {old_time*1000:8.2f}ms")
+    print(f"process_games(): {new_time*1000:8.2f}ms ({old_time/new_time:.2f}x)")
+
+if __name__ == "__main__":
+    main()
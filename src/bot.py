@@ -10,6 +10,8 @@ if os.getenv("on_heroku") != "TRUE":
     from dotenv import load_dotenv
     load_dotenv(dotenv_path="main.env")
 
+import osuapi
+import db_indexes
 import general_commands
 import staff_commands
 import match_commands
@@ -35,7 +37,14 @@ matchstats
 token = os.getenv("bot_token")
 
 prefix = "!!"
-bot = commands.Bot(command_prefix=commands.when_mentioned_or(prefix))
+
+class StkBot(commands.Bot):
+    """`commands.Bot` that also cleans up the shared osu! API session on shutdown."""
+    async def close(self):
+        await osuapi.close_session()
+        await super().close()
+
+bot = StkBot(command_prefix=commands.when_mentioned_or(prefix))
 
 bot.remove_command('help')
 
@@ -50,6 +59,11 @@ bot.add_cog(user_commands.UserStatsCommands(bot))
 @bot.event
 async def on_ready():
     await bot.change_presence(activity=discord.Game(name=f'{prefix}help'))
+    #idempotent, so it doesn't matter that on_ready runs again on reconnects
+    try:
+        await db_indexes.reconcile_indexes()
+    except Exception as e:
+        print(f"couldn't reconcile indexes: {e}")
     print('ready!')
 
 @bot.event
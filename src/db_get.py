@@ -1,73 +1,326 @@
 """Functions exclusively for getting and manipulating db documents (not adding/changing)."""
 
 import motor.motor_asyncio
+import pymongo
 import pprint
 import collections
+import copy
 import math
 import os
+import bisect
+import cachetools
 
 import osuapi
 import db_manip
+from singleflight import SingleFlight
 
 db_url = os.getenv("db_url")
 
 client = motor.motor_asyncio.AsyncIOMotorClient(db_url)
 
+#{diff_id: pool shorthand} for every map in every pool, built from `mappools.meta`
+#None until first used, and reset whenever the pools change (see refresh_pool_index())
+_pool_index = None
+#diff ids known to not be in any pool (warmups, mostly, but also anything users type into mapbest),
+#forgotten on refresh and after a while, so that maps added behind the bot's back are found eventually
+_pool_misses = cachetools.TTLCache(maxsize=int(os.getenv("pool_miss_cache_size", 1024)),
+                                   ttl=int(os.getenv("pool_miss_ttl", 60)))
+#bumped on every invalidation, so an index that was being loaded during one isn't kept
+_pool_generation = 0
+_pool_flights = SingleFlight()
+
+#process-local directory of the parts of player documents that never change between rebuilds:
+#{player id: PlayerEntry}, plus {lowercase username: player id} for lookups by name
+PlayerEntry = collections.namedtuple("PlayerEntry", ["user_id", "user_name", "user_lower", "team_name"])
+_player_directory = cachetools.LRUCache(maxsize=int(os.getenv("player_directory_size", 2048)))
+_player_names = cachetools.LRUCache(maxsize=int(os.getenv("player_directory_size", 2048)))
+#fields needed to make a PlayerEntry
+_player_entry_projection = {'user_name': 1, 'user_lower': 1, 'team_name': 1}
+
+#leaderboards are paginated by seeking past the last document of the previous page instead of
+#skipping, which stays cheap on deep pages and doesn't shift around while scores are being added.
+#the sort key of the last document of each page served is remembered so that plain page numbers
+#can seek, too: {(collection, query, sort_field): {page: (sort key, _id)}}
+page_size = 10
+_page_bookmarks = cachetools.LRUCache(maxsize=int(os.getenv("page_bookmark_size", 256)))
+
+#tournament-wide leaderboards (every score, player or team, optionally filtered by mod) are kept
+#in memory instead of sorting the whole collection on every call:
+#{(collection, mod, sort_field): [(sort key, _id), ...]}, in ascending order so new scores can be
+#bisected in - the best entry is the last one. built on first use, patched as scores are added
+#and dropped whenever averages change (see update_ranks())
+_leaderboards = {}
+#bumped on every change, so a board that was being loaded during one isn't kept
+_leaderboard_generation = 0
+_leaderboard_flights = SingleFlight()
+
+#{discord id: DiscordUser document}, so that commands don't need to look up their invoker every time
+#entries are dropped whenever db_manip writes them (see invalidate_user_document())
+_user_documents = cachetools.LRUCache(maxsize=int(os.getenv("user_cache_size", 1024)))
+#bumped on every invalidation, so a lookup that raced one isn't cached
+_user_generation = 0
+
+#near-static documents - the tournament meta document and the pool metas - which only change
+#when staff rebuild: {"meta" or "pool_metas": document(s)}. db_manip drops them whenever it
+#writes them (see invalidate_meta_cache()), and they expire on their own after a while in case
+#something else changes them
+_meta_cache = cachetools.TTLCache(maxsize=8, ttl=int(os.getenv("meta_cache_ttl", 60*10)))
+#bumped on every invalidation, so a load that raced one isn't cached
+_meta_generation = 0
+_meta_flights = SingleFlight()
+
+meta_cache_stats = {
+    "hits": 0,
+    "misses": 0,
+    "invalidations": 0,
+}
+
+#projection profiles, so that callers only fetch the fields they actually show:
+#{kind of document: {profile: projection}}
+#- "row" is one row of a leaderboard image
+#- "card" is a player or team card (and the highlighted invoker row under leaderboards)
+#- "embed" is a text embed, like teamstats
+#passing no profile fetches the whole document, including the long lists of score ids
+projections = {
+    "score": {
+        "row": {'user_id': 1, 'user_name': 1, 'diff_id': 1, 'map_type': 1, 'score': 1, 'accuracy': 1,
+                'contrib': 1, 'combo': 1, 'hits': 1},
+    },
+    "player": {
+        "row": {'user_name': 1, 'team_name': 1, 'cached.average_score': 1, 'cached.average_acc': 1,
+                'cached.average_contrib': 1},
+        "card": {'user_name': 1, 'team_name': 1, 'cached': 1},
+        "embed": {'user_name': 1, 'team_name': 1, 'pfp_url': 1, 'cached': 1},
+    },
+    "team": {
+        "row": {'cached.average_score': 1, 'cached.average_acc': 1},
+        "card": {'players': 1, 'cached': 1},
+        "embed": {'players': 1, 'cached': 1},
+    },
+}
+
+async def _load_pool_index():
+    """Load the diff id to pool index from the `mappools.meta` collection."""
+    async def load():
+        global _pool_index
+        generation = _pool_generation
+        cursor = client["mappools"]["meta"].find()
+        index = {}
+        #well i'd hope we never end up with 100 pools
+        for meta_document in await cursor.to_list(length=100):
+            for diff_id in meta_document["diff_ids"]:
+                index[diff_id] = meta_document["_id"]
+        if generation == _pool_generation:
+            _pool_index = index
+        return index
+    #concurrent callers (like a burst of determine_pool() calls on a cold start) share one load,
+    #but never one that started before the last invalidation
+    return await _pool_flights.run(("pool_index", _pool_generation), load)
+
+async def refresh_pool_index():
+    """Rebuild the diff id to pool index from the `mappools.meta` collection.
+    
+    This should be called whenever pools are added or removed; `add_pools()` and
+    `rebuild_all()` already do."""
+    invalidate_pool_index()
+    await _load_pool_index()
+
+def invalidate_pool_index():
+    """Forget the diff id to pool index; it'll be reloaded on the next `determine_pool()`."""
+    global _pool_index, _pool_generation
+    _pool_generation += 1
+    _pool_index = None
+    _pool_misses.clear()
+
 async def determine_pool(map_id):
     """Figure out what pool this `map_id` belongs in.
     
     Returns shorthand pool notation, equivalent to the collection name in 
-    the `mappools` database. Returns `None` on fail."""
-    db = client["mappools"]
-    collection = db["meta"]
-    cursor = collection.find()
-    #well i'd hope we never end up with 100 pools
-    for meta_document in await cursor.to_list(length=100):
-        if map_id in meta_document["diff_ids"]:
-            return meta_document["_id"]
-    return None
+    the `mappools` database. Returns `None` on fail.
+    
+    Lookups go through an in-memory index of every pooled map, so there's usually no
+    database round trip at all. If `map_id` isn't in the index, the `meta` collection is
+    checked directly in case it was changed by something other than the bot."""
+    index = _pool_index
+    if index is None:
+        index = await _load_pool_index()
+    pool = index.get(map_id)
+    if pool is not None:
+        return pool
+    if map_id in _pool_misses:
+        return None
+
+    generation = _pool_generation
+    meta_document = await client["mappools"]["meta"].find_one({'diff_ids': map_id}, {'_id': 1})
+    if generation != _pool_generation:
+        #the pools changed while this was being looked up, so don't remember anything
+        return meta_document["_id"] if meta_document else None
+    if not meta_document:
+        _pool_misses[map_id] = True
+        return None
+    if _pool_index is not None:
+        _pool_index[map_id] = meta_document["_id"]
+    return meta_document["_id"]
+
+async def _get_cached_meta(key, load):
+    """Get `key` from the meta cache, calling the coroutine function `load()` to fill it on a miss.
+    
+    The cached documents are shared, so callers must not modify them."""
+    if key in _meta_cache:
+        meta_cache_stats["hits"] += 1
+        return _meta_cache[key]
+    meta_cache_stats["misses"] += 1
+    async def fill():
+        generation = _meta_generation
+        value = await load()
+        if generation == _meta_generation:
+            _meta_cache[key] = value
+        return value
+    return await _meta_flights.run(key, fill)
+
+def invalidate_meta_cache():
+    """Forget the cached meta document and pool metas.
+    
+    Needs to be called whenever either of them are written; `add_meta()`, `add_pools()` and
+    `rebuild_all()` already do."""
+    global _meta_generation
+    _meta_generation += 1
+    meta_cache_stats["invalidations"] += 1
+    _meta_cache.clear()
+
+def get_meta_cache_stats():
+    """Returns a copy of the meta cache counters, plus the hit rate."""
+    lookups = meta_cache_stats["hits"] + meta_cache_stats["misses"]
+    return {
+        **meta_cache_stats,
+        "hit_rate": meta_cache_stats["hits"]/lookups if lookups else 0.0,
+    }
 
 async def get_meta_document():
     """Gets the tournament-wide meta document.
     
     If the meta document does not exist, returns None."""
-    db = client["tournament_data"]
-    meta_collection = db["meta"]
-    return await meta_collection.find_one({'_id': "main"})
+    async def load():
+        db = client["tournament_data"]
+        meta_collection = db["meta"]
+        return await meta_collection.find_one({'_id': "main"})
+    return await _get_cached_meta("meta", load)
 
 async def get_user_document(discord_id):
     """Get the DiscordUser document associated with a Discord ID.
     
     If this fails, generates a new DiscordUser document and returns
     the newly-created (though empty) document. (This guarantees a document
-    is always returned.)"""
-    db = client['discord_users']
-    discord_user_collection = db['discord_users']
-    user_document = await discord_user_collection.find_one({'_id': discord_id})
-    if not user_document:
-        await db_manip.create_discord_user(discord_id)
-        user_document = await discord_user_collection.find_one({'_id': discord_id})
-    return user_document
-
-async def get_player_document(player):
+    is always returned.)
+    
+    Documents are cached, so this usually doesn't touch the database. The returned document
+    is a copy and can be modified freely (and then saved with `db_manip.update_discord_user()`)."""
+    user_document = _user_documents.get(discord_id)
+    if user_document is None:
+        generation = _user_generation
+        db = client['discord_users']
+        discord_user_collection = db['discord_users']
+        #find-or-create in one atomic step, so two commands from a new user can't both try to create it
+        defaults = db_manip.new_discord_user_document(discord_id)
+        del defaults["_id"]
+        user_document = await discord_user_collection.find_one_and_update(
+            {'_id': discord_id}, {'$setOnInsert': defaults},
+            upsert=True, return_document=pymongo.ReturnDocument.AFTER)
+        if generation == _user_generation:
+            _user_documents[discord_id] = user_document
+    return copy.deepcopy(user_document)
+
+def invalidate_user_document(discord_id):
+    """Forget the cached DiscordUser document of `discord_id`; called whenever it's written."""
+    global _user_generation
+    _user_generation += 1
+    _user_documents.pop(discord_id, None)
+
+def _remember_player(player_document):
+    """Add a player document (which needs at least `_player_entry_projection`) to the directory."""
+    entry = PlayerEntry(player_document["_id"], player_document["user_name"],
+                        player_document["user_lower"], player_document["team_name"])
+    _player_directory[entry.user_id] = entry
+    _player_names[entry.user_lower] = entry.user_id
+    return entry
+
+def invalidate_player_directory():
+    """Forget every entry in the player directory.
+    
+    Needs to be called whenever players are added, removed, renamed or moved to another team.
+    (Stat updates don't touch any of the fields in the directory.)"""
+    _player_directory.clear()
+    _player_names.clear()
+
+async def _find_player(player, projection=None):
+    """Find the player document with the user ID or (case-insensitive) username `player` in one query."""
+    player_collection = client['players_and_teams']['players']
+    #mongodb queries are case-sensitive
+    #i think it is marginally faster for a collection of this size to simply cache
+    #lowercase usernames than it is to perform regex and force a lowercase result
+    #both _id and user_lower are indexed, so mongodb can answer each side of the $or from an index
+    cursor = player_collection.find({'$or': [{'_id': player}, {'user_lower': player.lower()}]}, projection)
+    player_documents = await cursor.to_list(length=2)
+    if not player_documents:
+        return None
+    #if someone's username happens to be someone else's user id, the id wins
+    for player_document in player_documents:
+        if player_document["_id"] == player:
+            return player_document
+    return player_documents[0]
+
+async def get_player_document(player, *, profile=None):
     """Get the player document associated with `player`.
     
     This will assume user ID (field _id) and then username, in that order.
-    If both fail, returns `None`."""
-    db = client['players_and_teams']
-    player_collection = db['players']
-    player_document = await player_collection.find_one({'_id': player})
+    If both fail, returns `None`. `profile` is a projection profile (see `projections`);
+    the whole document is returned by default.
+    
+    If you only need the player's name or team, use `get_player_entry()` instead."""
+    projection = None
+    if profile:
+        #the player directory needs a few fields of its own
+        projection = {**_player_entry_projection, **projections["player"][profile]}
+    player_document = await _find_player(player, projection)
+    if player_document:
+        _remember_player(player_document)
+    return player_document
+
+async def get_player_entry(player):
+    """Get the `PlayerEntry` (user ID, name, lowercase name and team) of `player`.
+    
+    Like `get_player_document()`, `player` can be a user ID or a username, but this
+    is answered from the in-memory player directory whenever possible. Returns `None`
+    if the player doesn't exist."""
+    entry = _player_directory.get(player)
+    if entry is None and player.lower() in _player_names:
+        entry = _player_directory.get(_player_names[player.lower()])
+    if entry is not None:
+        return entry
+    player_document = await _find_player(player, _player_entry_projection)
     if not player_document:
-        #mongodb queries are case-sensitive
-        #i think it is marginally faster for a collection of this size to simply cache
-        #lowercase usernames than it is to perform regex and force a lowercase result
-        player_document_2 = await player_collection.find_one({'user_lower': player.lower()})
-        if not player_document_2:
-            return None
+        return None
+    return _remember_player(player_document)
+
+async def get_player_entries(player_ids):
+    """Get the `PlayerEntry` of every user ID in `player_ids`, in the same order.
+    
+    Players missing from the directory are fetched in one query. Players that don't
+    exist are `None`."""
+    entries = {}
+    missing = []
+    for player_id in dict.fromkeys(player_ids):
+        entry = _player_directory.get(player_id)
+        if entry is None:
+            missing.append(player_id)
         else:
-            return player_document_2
-    else:
-        return player_document
+            entries[player_id] = entry
+    if missing:
+        player_collection = client['players_and_teams']['players']
+        cursor = player_collection.find({'_id': {'$in': missing}}, _player_entry_projection)
+        for player_document in await cursor.to_list(length=None):
+            entries[player_document["_id"]] = _remember_player(player_document)
+    return [entries.get(player_id) for player_id in player_ids]
 
 async def get_name_from_user(discord_id, *, return_player):
     """Get the osu! ID or team associated with `discord_id`.
@@ -88,15 +341,17 @@ async def get_name_from_user(discord_id, *, return_player):
         else:
             return user_doc["team_name"]
 
-async def get_team_document(team):
+async def get_team_document(team, *, profile=None):
     """Get the team document associated with `team_name`.
     
     `team_name` should be an exact match of an _id in the teams collection.
     However, `name_lower` is the actual field queried.
-    If a document cannot be found, `None` is returned."""
+    If a document cannot be found, `None` is returned. `profile` is a projection profile
+    (see `projections`); the whole document is returned by default."""
     db = client['players_and_teams']
     team_collection = db['teams']
-    return await team_collection.find_one({'name_lower': team.lower()})
+    projection = projections["team"][profile] if profile else None
+    return await team_collection.find_one({'name_lower': team.lower()}, projection)
 
 async def get_map_document(id, pool=None):
     """Get the document associated with `id`.
@@ -134,8 +389,99 @@ async def get_match_document(match_id):
     matches_collection = db['matches']
     return await matches_collection.find_one({'_id': match_id})
 
+def _sort_key(document, sort_field):
+    """Get the (possibly dotted, like `cached.average_score`) `sort_field` of `document`."""
+    for part in sort_field.split("."):
+        document = document[part]
+    return document
+
+def invalidate_leaderboards(collection_name=None):
+    """Forget every remembered page position and in-memory leaderboard.
+    
+    Should be called whenever scores or stats change. If `collection_name` (like
+    `"players_and_teams.players"`) is passed, only the leaderboards of that collection are dropped."""
+    global _leaderboard_generation
+    _leaderboard_generation += 1
+    _page_bookmarks.clear()
+    for board_key in list(_leaderboards):
+        if collection_name is None or board_key[0] == collection_name:
+            del _leaderboards[board_key]
+
+def add_scores_to_leaderboards(score_documents):
+    """Insert newly added Score documents into the in-memory score leaderboards that are already built.
+    
+    Boards that haven't been built yet will include the new scores when they are."""
+    global _leaderboard_generation
+    _leaderboard_generation += 1
+    _page_bookmarks.clear()
+    score_collection = client['matches_and_scores']['scores']
+    for (collection_name, mod, sort_field), board in _leaderboards.items():
+        if collection_name != score_collection.full_name:
+            continue
+        for score_document in score_documents:
+            if mod is None or score_document["map_type"] == mod:
+                bisect.insort(board, (score_document[sort_field], score_document["_id"]))
+
+async def _get_leaderboard(collection, sort_field, mod=None):
+    """Get the in-memory leaderboard of `collection` by `sort_field`, loading it if needed."""
+    board_key = (collection.full_name, mod, sort_field)
+    board = _leaderboards.get(board_key)
+    if board is not None:
+        return board
+    async def load():
+        generation = _leaderboard_generation
+        query = {'map_type': mod} if mod else {}
+        #only the sort key and _id of each document are needed
+        cursor = collection.find(query, {sort_field: 1}).sort([(sort_field, 1), ('_id', 1)])
+        board = [(_sort_key(document, sort_field), document["_id"]) for document in await cursor.to_list(length=None)]
+        if generation == _leaderboard_generation:
+            _leaderboards[board_key] = board
+        return board
+    return await _leaderboard_flights.run(board_key, load)
+
+async def _get_leaderboard_page(collection, board, page, projection=None):
+    """Get a page of documents from `collection` in the order of `board` (best first).
+    
+    Returns the tuple `([<documents>], page)`. Only the documents on the page are fetched from
+    the database, with `projection` if passed."""
+    page = max(page, 1)
+    end = len(board)-(page-1)*page_size
+    ids = [id for _, id in reversed(board[max(end-page_size, 0):max(end, 0)])]
+    if not ids:
+        return ([], page)
+    cursor = collection.find({'_id': {'$in': ids}}, projection)
+    documents = {document["_id"]: document for document in await cursor.to_list(length=len(ids))}
+    #documents deleted since the board was built are left out
+    return ([documents[id] for id in ids if id in documents], page)
+
+async def _get_page(collection, query, sort_field, page, projection=None):
+    """Get a page of `collection`, sorted by `sort_field` (descending) and then `_id`.
+    
+    Returns the tuple `([<documents>], page)`. The query seeks from the closest remembered page
+    at or before `page` and skips the rest of the way.
+    
+    `projection` must include `sort_field` if passed."""
+    bookmark_key = (collection.full_name, repr(query), sort_field)
+    bookmarks = _page_bookmarks.get(bookmark_key, {})
+    page = max(page, 1)
+    start = max([bookmarked for bookmarked in bookmarks if bookmarked <= page], default=1)
+    seek = bookmarks.get(start)
+    skip = (page-start)*page_size
+
+    if seek:
+        key, id = seek
+        query = {'$and': [query, {'$or': [{sort_field: {'$lt': key}}, {sort_field: key, '_id': {'$lt': id}}]}]}
+    #_id breaks ties, so every document has a unique position to seek from
+    cursor = collection.find(query, projection).sort([(sort_field, -1), ('_id', -1)]).skip(skip).limit(page_size)
+    documents = await cursor.to_list(length=page_size)
+
+    if len(documents) == page_size:
+        bookmarks[page+1] = (_sort_key(documents[-1], sort_field), documents[-1]["_id"])
+        _page_bookmarks[bookmark_key] = bookmarks
+    return (documents, page)
+
 #redundant yes but it made more sense to me    
-async def get_top_player_scores(player_id, page=1, mod=None):
+async def get_top_player_scores(player_id, page=1, mod=None, *, profile=None):
     """Get the top n scores (as documents) of a player, filtered by mod if defined, and the max page.
     
     Returns the tuple `([<documents>], max_page)`.
@@ -146,20 +492,19 @@ async def get_top_player_scores(player_id, page=1, mod=None):
     - `page` determines the top scores to be returned. Pagination is done on a 10 score
     per page basis; if `page*10` exceeds the total number of scores of the player plus 10,
     then the last reasonable page is used instead. For example, a player with 22 scores has
-    pages of 1-10, 11-20, and 21-22. Page 4 will redirect to 21-22. Values less than 1 redirect
-    to page 1. Starts at 1; is *not* zero-indexed.
+    pages of 1-10, 11-20, and 21-22. Page 4 will redirect to 21-22.
+    Values less than 1 redirect to page 1. Starts at 1; is *not* zero-indexed.
+    - `profile` is a projection profile for the score documents (see `projections`); whole documents by default.
     - `mod` is the mod, in shorthand notation (NM/HR/...) to filter scores with. Shorthand pool 
     prefixes are used, with valid mods in the array `["NM", "HR", "HD", "DT", "FM"]`.
     
     Note this function does no additional work towards generating a Discord embed. If the player
     is not found, this function returns `(None, None, None)`. If no scores are found but the player exists, 
     `([], <page>, 0)` is returned."""
-    db = client['players_and_teams']
-    player_collection = db['players']
-    player_document = await get_player_document(player_id)
+    #only the cached counts are needed, not the (long) list of score ids
+    player_document = await _find_player(player_id, {'cached': 1})
     if player_document is None:
         return (None, None, None)
-    scores = player_document["scores"]
     
     #the number of scores depends on what scores were requested
     mod_mapping = {
@@ -180,16 +525,17 @@ async def get_top_player_scores(player_id, page=1, mod=None):
     if page > max_page:
         #24 scores -> 2.4 -> 3 pages; 40 scores -> 4 -> 4 pages, etc
         page = max_page
-    #i am not actually sure if querying based on the list of scores or simply
-    #doing a full query is faster
+    #answered by the (user_id, score, _id) and (user_id, map_type, score, _id) indexes
     score_collection = client['matches_and_scores']['scores']
     if not mod:
-        cursor = score_collection.find({'_id': {'$in': scores}}).sort("score", -1).skip((page-1)*10).limit(10)
+        query = {'user_id': player_document["_id"]}
     else:
-        cursor = score_collection.find({'_id': {'$in': scores}, 'map_type': mod}).sort("score", -1).skip((page-1)*10).limit(10)
-    return (await cursor.to_list(length=10), page, max_page)
+        query = {'user_id': player_document["_id"], 'map_type': mod}
+    documents, page = await _get_page(score_collection, query, "score", page,
+                                      projections["score"][profile] if profile else None)
+    return (documents, page, max_page)
 
-async def get_top_team_scores(team_name, page=1, mod=None):
+async def get_top_team_scores(team_name, page=1, mod=None, *, profile=None):
     """Get the top n scores (as documents) of a team, filtered by mod if defined, and the max page.
     
     Returns the tuple `([<documents>], page, max_page)`.
@@ -200,6 +546,7 @@ async def get_top_team_scores(team_name, page=1, mod=None):
     per page basis; if `page*10` exceeds the total number of scores of the player plus 10,
     then the last reasonable page is used instead. For example, a player with 22 scores has
     pages of 1-10, 11-20, and 21-22. Page 4 will redirect to 21-22.
+    - `profile` is a projection profile for the score documents (see `projections`); whole documents by default.
     - `mod` is the mod, in shorthand notation (NM/HR/...) to filter scores with. Shorthand pool 
     prefixes are used, with valid mods in the array `["NM", "HR", "HD", "DT", "FM"]`.
     
@@ -208,10 +555,10 @@ async def get_top_team_scores(team_name, page=1, mod=None):
     `([], <page>, 0)` is returned."""
     db = client['players_and_teams']
     team_collection = db['teams']
-    team_document = await get_team_document(team_name)
+    #only the players and cached counts are needed, not the (long) list of score ids
+    team_document = await team_collection.find_one({'name_lower': team_name.lower()}, {'players': 1, 'cached': 1})
     if team_document is None:
         return (None, None, None)
-    scores = team_document["scores"]
 
     #the number of scores depends on what scores were requested
     mod_mapping = {
@@ -232,16 +579,18 @@ async def get_top_team_scores(team_name, page=1, mod=None):
     if page > max_page:
         #24 scores -> 2.4 -> 3 pages; 40 scores -> 4 -> 4 pages, etc
         page = max_page
-    #i am not actually sure if querying based on the list of scores or simply
-    #doing a full query is faster
+    #a team's scores are its players' scores, so this uses the same indexes as get_top_player_scores()
+    #(mongodb merges the per-player index ranges instead of sorting in memory)
     score_collection = client['matches_and_scores']['scores']
     if not mod:
-        cursor = score_collection.find({'_id': {'$in': scores}}).sort("score", -1).skip((page-1)*10).limit(10)
+        query = {'user_id': {'$in': team_document["players"]}}
     else:
-        cursor = score_collection.find({'_id': {'$in': scores}, 'map_type': mod}).sort("score", -1).skip((page-1)*10).limit(10)
-    return (await cursor.to_list(length=10), page, max_page)
+        query = {'user_id': {'$in': team_document["players"]}, 'map_type': mod}
+    documents, page = await _get_page(score_collection, query, "score", page,
+                                      projections["score"][profile] if profile else None)
+    return (documents, page, max_page)
 
-async def get_top_map_scores(map_id, page=1, pool=None):
+async def get_top_map_scores(map_id, page=1, pool=None, *, profile=None):
     """Get the top n scores (as documents) of a map.
     
     Returns `([<documents>], page, max_page)`.
@@ -250,6 +599,7 @@ async def get_top_map_scores(map_id, page=1, pool=None):
     per page basis; if `page*10` exceeds the total number of scores of the player plus 10,
     then the last reasonable page is used instead. For example, a player with 22 scores has
     pages of 1-10, 11-20, and 21-22. Page 4 will redirect to 21-22.
+    - `profile` is a projection profile for the score documents (see `projections`); whole documents by default.
     - `pool` is the shorthand pool name. If not defined, `map_id` must be a diff id resolvable with
     `determine_pool()`.
     
@@ -259,19 +609,20 @@ async def get_top_map_scores(map_id, page=1, pool=None):
     map_document = await get_map_document(map_id)
     if not map_document:
         return (None, None, None)
-    scores = map_document["scores"]
 
-    max_page = math.ceil(len(scores)/10)
+    max_page = math.ceil(map_document["stats"]["total_scores"]/10)
     if page < 0:
         page = 1
     if page > max_page:
         page = max_page
 
     score_collection = client['matches_and_scores']['scores']
-    cursor = score_collection.find({'_id': {'$in': scores}}).sort("score", -1).skip((page-1)*10).limit(10)
-    return (await cursor.to_list(length=10), page, max_page)
+    #answered by the (diff_id, score, _id) index
+    documents, page = await _get_page(score_collection, {'diff_id': map_document["_id"]}, "score", page,
+                                      projections["score"][profile] if profile else None)
+    return (documents, page, max_page)
 
-async def get_top_tournament_players(leaderboard_field="score", page=1):
+async def get_top_tournament_players(leaderboard_field="score", page=1, *, profile=None):
     """Get the best players (as documents) in a certain average category.
     
     Returns the tuple `(<players>, page, max_pages)`.
@@ -280,30 +631,31 @@ async def get_top_tournament_players(leaderboard_field="score", page=1):
     per page basis; if `page*10` exceeds the total number of scores of the player plus 10,
     then the last reasonable page is used instead. For example, a player with 22 scores has
     pages of 1-10, 11-20, and 21-22. Page 4 will redirect to 21-22.
+    - `profile` is a projection profile for the player documents (see `projections`); whole documents by default.
     
     Note this function does no additional work towards generating a Discord embed.
     If no players are found, `([], 0)` is returned."""
     db = client['players_and_teams']
     player_collection = db['players']
 
-    player_count = await player_collection.estimated_document_count()
-
-    max_page = math.ceil(player_count/10)
-    if page < 0:
-        page = 1
-    if page > max_page:
-        page = max_page
-
     fields = {
         "score": "cached.average_score",
         "acc": "cached.average_acc",
         "contrib": "cached.average_contrib"
     }
+    board = await _get_leaderboard(player_collection, fields[leaderboard_field])
 
-    cursor = player_collection.find().sort(fields[leaderboard_field], -1).skip((page-1)*10).limit(10)
-    return (await cursor.to_list(length=10), page, max_page)
+    max_page = math.ceil(len(board)/10)
+    if page < 0:
+        page = 1
+    if page > max_page:
+        page = max_page
+
+    documents, page = await _get_leaderboard_page(player_collection, board, page,
+                                                  projections["player"][profile] if profile else None)
+    return (documents, page, max_page)
 
-async def get_top_tournament_teams(leaderboard_field="score", page=1):
+async def get_top_tournament_teams(leaderboard_field="score", page=1, *, profile=None):
     """Get the best teams (as documents) in a certain average category.
     
     Returns the tuple (<teams>, page, max_pages).
@@ -312,31 +664,32 @@ async def get_top_tournament_teams(leaderboard_field="score", page=1):
     per page basis; if `page*10` exceeds the total number of scores of the player plus 10,
     then the last reasonable page is used instead. For example, a player with 22 scores has
     pages of 1-10, 11-20, and 21-22. Page 4 will redirect to 21-22.
+    - `profile` is a projection profile for the team documents (see `projections`); whole documents by default.
     
     Note this function does no additional work towards generating a Discord embed.
     If no teams are found, `([], 0)` is returned."""
     db = client['players_and_teams']
     team_collection = db['teams']
 
-    team_count = await team_collection.estimated_document_count()
-
-    max_page = math.ceil(team_count/10)
-    if page < 0:
-        page = 1
-    if page > max_page:
-        page = max_page
-
     fields = {
         "score": "cached.average_score",
         "acc": "cached.average_acc",
     }
     #if leaderboard_field not in fields return None ?
     #we can just do command-level validation
+    board = await _get_leaderboard(team_collection, fields[leaderboard_field])
+
+    max_page = math.ceil(len(board)/10)
+    if page < 0:
+        page = 1
+    if page > max_page:
+        page = max_page
 
-    cursor = team_collection.find().sort(fields[leaderboard_field], -1).skip((page-1)*10).limit(10)
-    return (await cursor.to_list(length=10), page, max_page)
+    documents, page = await _get_leaderboard_page(team_collection, board, page,
+                                                  projections["team"][profile] if profile else None)
+    return (documents, page, max_page)
 
-async def get_top_tournament_scores(leaderboard_field="score", page=1, mod=None):
+async def get_top_tournament_scores(leaderboard_field="score", page=1, mod=None, *, profile=None):
     """Get the best scores (as documents) in a certain category.
     
     Returns the tuple `(<scores>, page, max_pages)`.
@@ -347,6 +700,7 @@ async def get_top_tournament_scores(leaderboard_field="score", page=1, mod=None)
     per page basis; if `page*10` exceeds the total number of scores of the player plus 10,
     then the last reasonable page is used instead. For example, a player with 22 scores has
     pages of 1-10, 11-20, and 21-22. Page 4 will redirect to 21-22.
+    - `profile` is a projection profile for the score documents (see `projections`); whole documents by default.
     - `mod` is the mod, in shorthand notation (NM/HR/...) to filter scores with. Shorthand pool 
     prefixes are used, with valid mods in the array `["NM", "HR", "HD", "DT", "FM"]`.
     
@@ -354,17 +708,6 @@ async def get_top_tournament_scores(leaderboard_field="score", page=1, mod=None)
     If no scores are found, `([], 0, <page>)` is returned."""
     score_collection = client['matches_and_scores']['scores']
 
-    if mod is None:
-        score_count = await score_collection.estimated_document_count()
-    else:
-        score_count = await score_collection.count_documents({"map_type": mod})
-
-    max_page = math.ceil(score_count/10)
-    if page < 0:
-        page = 1
-    if page > max_page:
-        page = max_page
-
     #lol
     fields = {
         "score": "score",
@@ -373,21 +716,28 @@ async def get_top_tournament_scores(leaderboard_field="score", page=1, mod=None)
     }
     #if leaderboard_field not in fields return None ?
     #we can just do command-level validation
+    board = await _get_leaderboard(score_collection, fields[leaderboard_field], mod)
 
-    if mod:
-        cursor = score_collection.find({"map_type": mod}).sort(fields[leaderboard_field], -1).skip((page-1)*10).limit(10)
-    else:
-        cursor = score_collection.find().sort(fields[leaderboard_field], -1).skip((page-1)*10).limit(10)
-    return (await cursor.to_list(length=10), page, max_page)
+    max_page = math.ceil(len(board)/10)
+    if page < 0:
+        page = 1
+    if page > max_page:
+        page = max_page
+
+    documents, page = await _get_leaderboard_page(score_collection, board, page,
+                                                  projections["score"][profile] if profile else None)
+    return (documents, page, max_page)
 
 async def get_pool_metas():
     """Get the pool meta documents."""
-    db = client['mappools']
-    collection = db['meta']
-    cursor = collection.find()
-    return (await cursor.to_list(length=100))
-
-async def get_best_user_score(map_id, player):
+    async def load():
+        db = client['mappools']
+        collection = db['meta']
+        cursor = collection.find()
+        return (await cursor.to_list(length=100))
+    return await _get_cached_meta("pool_metas", load)
+
+async def get_best_user_score(map_id, player, *, profile=None):
     """Get the player's best score on the specified map_id.
     
     Returns the tuple `(best_score_doc, rank, extra_count)` if found:
@@ -396,19 +746,46 @@ async def get_best_user_score(map_id, player):
     - `extra_count` is the number of additional scores this user has on this map,
     excluding their best score.
     If the player has no score on this map, returns (None, 0, 0).
-    If the player or the map doesn't exist, returns (None, None, None)."""
-    map_document = await get_map_document(map_id)
-    if not map_document:
-        return (None, None, None)
-    player_document = await get_player_document(player)
-    if not player_document:
-        return (None, None, None)
+    If the player or the map doesn't exist, returns (None, None, None).
+    `profile` is a projection profile for `best_score_doc` (see `projections`).
     
+    The player and (usually) the map are resolved in memory. The best score and the score count
+    are found by one aggregation over the map's scores, and the rank by counting the scores above
+    the best one; both use the (diff_id, score, _id) index."""
+    if map_id.isdigit():
+        #diff ids are resolved against the in-memory pool index, so there's no round trip
+        if not await determine_pool(map_id):
+            return (None, None, None)
+        diff_id = map_id
+    else:
+        map_document = await get_map_document(map_id)
+        if not map_document:
+            return (None, None, None)
+        diff_id = map_document["_id"]
+    player_entry = await get_player_entry(player)
+    if not player_entry:
+        return (None, None, None)
+
+    best_stages = [{'$sort': {'score': -1}}, {'$limit': 1}]
+    if profile:
+        #the rank needs the score itself, whatever the profile
+        best_stages.append({'$project': {**projections["score"][profile], 'score': 1}})
     score_collection = client['matches_and_scores']['scores']
-    highest_score_doc = await score_collection.find_one({'user_id': player_document["_id"], 'diff_id': map_document["_id"]}, sort=[("score", -1)])
-    if not highest_score_doc:
+    cursor = score_collection.aggregate([
+        {'$match': {'diff_id': diff_id, 'user_id': player_entry.user_id}},
+        {'$facet': {
+            'best': best_stages,
+            'count': [{'$count': 'n'}]
+        }},
+        {'$project': {
+            'best': {'$arrayElemAt': ['$best', 0]},
+            'count': {'$arrayElemAt': ['$count.n', 0]}
+        }}
+    ])
+    result = (await cursor.to_list(length=1))[0]
+    if not result.get("best"):
         return (None, 0, 0)
-    extra_count = (await score_collection.count_documents({'user_id': player_document["_id"], 'diff_id': map_document["_id"]}))-1
-    rank = (await score_collection.count_documents({'diff_id': map_document["_id"], 'score': {"$gt": highest_score_doc["score"]}}))+1
-    return (highest_score_doc, rank, extra_count)
+    #rank is 1 + the number of scores on this map higher than the best one
+    higher = await score_collection.count_documents({'diff_id': diff_id, 'score': {'$gt': result["best"]["score"]}})
+    return (result["best"], higher+1, result["count"]-1)
     
@@ -0,0 +1,217 @@
+"""Every index the bot relies on, in one place.
+
+`indexes` declares the indexes of each collection. `reconcile_indexes()` makes the database
+match it: missing indexes are created and indexes whose keys changed are rebuilt. Indexes that
+aren't declared are reported but left alone. It's idempotent, and runs when the bot starts and
+after every rebuild.
+
+`query_shapes` lists the queries db_get makes against large collections,
+with placeholder values. Running this file against a local mongod seeds throwaway copies of the
+databases, reconciles them and explains each query shape, failing if any of them would scan a
+whole collection:
+
+    python db_indexes.py [mongodb://localhost:27017]
+
+Lookups by `_id` alone are always answered by the default `_id` index, so they aren't listed.
+"""
+import asyncio
+import sys
+import motor.motor_asyncio
+import pymongo
+
+import db_get
+
+#stands in for every pool collection in the `mappools` database (one per pool, named after the
+#shorthand pool name, like "QF"); the actual names are read from `mappools.meta`
+pool_collections = "<pool>"
+
+#{(database, collection): [[(field, direction), ...], ...]}
+#indexes are named by mongodb's default scheme ("user_id_1_score_-1__id_-1"), which is what
+#the older inline create_index() calls produced - so existing databases already match
+indexes = {
+    ("mappools", "meta"): [
+        #determine_pool() fallback
+        [("diff_ids", 1)],
+    ],
+    ("mappools", pool_collections): [
+        #get_map_document() by shorthand ("NM1")
+        [("pool_id", 1)],
+    ],
+    ("players_and_teams", "players"): [
+        #tournament leaderboards sort on a cached average and then _id
+        [("cached.average_acc", -1), ("_id", -1)],
+        [("cached.average_score", -1), ("_id", -1)],
+        [("cached.average_contrib", -1), ("_id", -1)],
+        [("user_name", -1)],
+        #_find_player() by (lowercase) username
+        [("user_lower", -1)],
+    ],
+    ("players_and_teams", "teams"): [
+        [("cached.average_acc", -1), ("_id", -1)],
+        [("cached.average_score", -1), ("_id", -1)],
+        #get_team_document() and get_top_team_scores()
+        [("name_lower", -1)],
+    ],
+    ("matches_and_scores", "scores"): [
+        #tournament-wide leaderboards, with and without a mod filter
+        [("score", -1), ("_id", -1)],
+        [("map_type", 1), ("score", -1), ("_id", -1)],
+        [("accuracy", -1), ("_id", -1)],
+        [("map_type", 1), ("accuracy", -1), ("_id", -1)],
+        [("contrib", -1), ("_id", -1)],
+        [("map_type", 1), ("contrib", -1), ("_id", -1)],
+        #per-player, per-team (through its players) and per-map leaderboards
+        [("user_id", 1), ("score", -1), ("_id", -1)],
+        [("user_id", 1), ("map_type", 1), ("score", -1), ("_id", -1)],
+        [("diff_id", 1), ("score", -1), ("_id", -1)],
+    ],
+}
+
+#(name, database, collection, query) - `query` is either `{"filter": ..., "sort": ...}` for a find
+#or `{"pipeline": [...]}` for an aggregation
+query_shapes = [
+    ("determine_pool", "mappools", "meta", {"filter": {'diff_ids': "1"}}),
+    ("get_map_document (shorthand)", "mappools", pool_collections, {"filter": {'pool_id': "NM1"}}),
+    ("_find_player", "players_and_teams", "players",
+     {"filter": {'$or': [{'_id': "1"}, {'user_lower': "player"}]}}),
+    ("get_team_document", "players_and_teams", "teams", {"filter": {'name_lower': "team"}}),
+    ("get_top_player_scores", "matches_and_scores", "scores",
+     {"filter": {'user_id': "1"}, "sort": [("score", -1), ("_id", -1)]}),
+    ("get_top_player_scores (mod)", "matches_and_scores", "scores",
+     {"filter": {'user_id': "1", 'map_type': "NM"}, "sort": [("score", -1), ("_id", -1)]}),
+    ("get_top_team_scores", "matches_and_scores", "scores",
+     {"filter": {'user_id': {'$in': ["1", "2"]}}, "sort": [("score", -1), ("_id", -1)]}),
+    ("get_top_team_scores (mod)", "matches_and_scores", "scores",
+     {"filter": {'user_id': {'$in': ["1", "2"]}, 'map_type': "NM"}, "sort": [("score", -1), ("_id", -1)]}),
+    ("get_top_map_scores", "matches_and_scores", "scores",
+     {"filter": {'diff_id': "1"}, "sort": [("score", -1), ("_id", -1)]}),
+    ("get_best_user_score", "matches_and_scores", "scores",
+     {"pipeline": [{'$match': {'diff_id': "1", 'user_id': "1"}},
+                   {'$facet': {'best': [{'$sort': {'score': -1}}, {'$limit': 1}]}}]}),
+    ("get_best_user_score (rank)", "matches_and_scores", "scores",
+     {"filter": {'diff_id': "1", 'score': {'$gt': 0}}}),
+]
+#pages past a remembered position seek past its (score, _id) (see db_get._get_page())
+for name, query in [("get_top_player_scores", {'user_id': "1"}),
+                    ("get_top_player_scores (mod)", {'user_id': "1", 'map_type': "NM"}),
+                    ("get_top_team_scores", {'user_id': {'$in': ["1", "2"]}}),
+                    ("get_top_team_scores (mod)", {'user_id': {'$in': ["1", "2"]}, 'map_type': "NM"}),
+                    ("get_top_map_scores", {'diff_id': "1"})]:
+    seek = {'$or': [{'score': {'$lt': 1000000}}, {'score': 1000000, '_id': {'$lt': "1-1-0"}}]}
+    query_shapes.append((f"{name} (seek)", "matches_and_scores", "scores",
+                         {"filter": {'$and': [query, seek]}, "sort": [("score", -1), ("_id", -1)]}))
+#tournament leaderboards are loaded sorted by each field, with and without a mod filter
+for field, collection_name in [("cached.average_acc", "players"), ("cached.average_score", "players"),
+                               ("cached.average_contrib", "players"), ("cached.average_acc", "teams"),
+                               ("cached.average_score", "teams")]:
+    query_shapes.append((f"_get_leaderboard ({collection_name}, {field})", "players_and_teams", collection_name,
+                         {"filter": {}, "sort": [(field, 1), ("_id", 1)]}))
+for field in ["score", "accuracy", "contrib"]:
+    query_shapes.append((f"_get_leaderboard (scores, {field})", "matches_and_scores", "scores",
+                         {"filter": {}, "sort": [(field, 1), ("_id", 1)]}))
+    query_shapes.append((f"_get_leaderboard (scores, {field}, mod)", "matches_and_scores", "scores",
+                         {"filter": {'map_type': "NM"}, "sort": [(field, 1), ("_id", 1)]}))
+
+async def _collections(client, database_name, collection_name, prefix=""):
+    """Get the collections `(database_name, collection_name)` of `indexes` refers to."""
+    db = client[prefix+database_name]
+    if collection_name != pool_collections:
+        return [db[collection_name]]
+    cursor = db["meta"].find({}, {'_id': 1})
+    return [db[meta_document["_id"]] for meta_document in await cursor.to_list(length=100)]
+
+async def _reconcile_collection(collection, keys_list):
+    """Make the indexes of `collection` match `keys_list`. Returns the number of indexes created or rebuilt."""
+    existing = await collection.index_information()
+    missing = []
+    for keys in keys_list:
+        model = pymongo.IndexModel(keys)
+        name = model.document["name"]
+        if name in existing:
+            if [(field, int(direction)) for field, direction in existing[name]["key"]] == keys:
+                continue
+            #same name but different keys, so it has to be rebuilt
+            await collection.drop_index(name)
+        missing.append(model)
+    if missing:
+        await collection.create_indexes(missing)
+
+    declared = {pymongo.IndexModel(keys).document["name"] for keys in keys_list}
+    for name in existing:
+        if name != "_id_" and name not in declared:
+            print(f"{collection.full_name} has an undeclared index {name}, leaving it alone")
+    return len(missing)
+
+async def reconcile_indexes(*database_names, client=None, prefix=""):
+    """Create or rebuild any index in `indexes` that doesn't match the database.
+
+    - `database_names` limits this to those databases; every database in `indexes` by default.
+    - `client` is the motor client to use, `db_get.client` by default.
+    - `prefix` is prepended to every database name (used by `check_queries()`).
+
+    Returns the number of indexes created or rebuilt."""
+    if client is None:
+        client = db_get.client
+    changed = 0
+    for (database_name, collection_name), keys_list in indexes.items():
+        if database_names and database_name not in database_names:
+            continue
+        for collection in await _collections(client, database_name, collection_name, prefix):
+            changed += await _reconcile_collection(collection, keys_list)
+    if changed:
+        print(f"created or rebuilt {changed} indexes")
+    return changed
+
+def _find_stages(explain, stage):
+    """Returns True if the (nested) explain output `explain` contains a plan stage called `stage`."""
+    if isinstance(explain, dict):
+        if explain.get("stage") == stage:
+            return True
+        return any(_find_stages(value, stage) for value in explain.values())
+    if isinstance(explain, list):
+        return any(_find_stages(value, stage) for value in explain)
+    return False
+
+async def check_queries(client, prefix="index_check_"):
+    """Explain every query shape against throwaway copies of the databases.
+
+    The copies (named `prefix` + the usual database name) get one placeholder document per
+    collection, since mongodb doesn't plan queries against collections that don't exist, and are
+    dropped afterwards. Returns the names of the query shapes that do a COLLSCAN."""
+    database_names = {database_name for database_name, _ in indexes}
+    try:
+        await client[prefix+"mappools"]["meta"].insert_one({'_id': "QF", 'diff_ids': ["1"]})
+        for database_name, collection_name in indexes:
+            for collection in await _collections(client, database_name, collection_name, prefix):
+                if collection.name != "meta":
+                    await collection.insert_one({})
+        await reconcile_indexes(client=client, prefix=prefix)
+
+        failed = []
+        for name, database_name, collection_name, query in query_shapes:
+            for collection in await _collections(client, database_name, collection_name, prefix):
+                if "pipeline" in query:
+                    explain = await collection.database.command("aggregate", collection.name,
+                                                                pipeline=query["pipeline"], explain=True)
+                else:
+                    cursor = collection.find(query["filter"])
+                    if query.get("sort"):
+                        cursor = cursor.sort(query["sort"])
+                    explain = await cursor.explain()
+                if _find_stages(explain, "COLLSCAN"):
+                    failed.append(name)
+        return failed
+    finally:
+        for database_name in database_names:
+            await client.drop_database(prefix+database_name)
+
+async def _main(db_url):
+    client = motor.motor_asyncio.AsyncIOMotorClient(db_url)
+    failed = await check_queries(client)
+    for name in failed:
+        print(f"COLLSCAN: {name}")
+    print(f"{len(query_shapes)-len(failed)}/{len(query_shapes)} query shapes are covered by an index")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "mongodb://localhost:27017")))
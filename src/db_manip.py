@@ -110,6 +110,7 @@ The cluster structure is as follows:
 {
     _id: str (/b is guaranteed to be unique)
     scores: [str, str, ...] #Score document _id's
+    banned_in: [str, str, ...] #ids of the matches whose bans have been counted
     pool_id: str (of NM1, HD2, HR3, etc)
     map_type: str (of NM, HD, HR, etc)
     map_url: str
@@ -236,13 +237,18 @@ not ints/floats as the data might suggest; this will hopefully improve clarity
 also all accuracy is stored internally as a double from 0 to 1; they are not stored in xx.xx format
 """
 import motor.motor_asyncio
+import pymongo
 import pprint
 import collections
 import os
 import asyncio
+import functools
+import time
 
 import osuapi
+import gsheet
 import db_get
+import db_indexes
 import prompts
 
 #to implement pagination we can use cursor.skip()
@@ -252,6 +258,16 @@ db_url = os.getenv("db_url")
 
 client = motor.motor_asyncio.AsyncIOMotorClient(db_url)
 
+#how many matches add_scores() fetches and resolves at once; the osu! api rate limiter still applies on top of this
+ingest_concurrency = max(1, int(os.getenv("ingest_concurrency", 4)))
+
+#every match add_scores() works on gets an entry in the `ingest_journal` collection of `matches_and_scores`:
+#{"_id": match_id, "scores": [score _ids, in order], "team_names": [the team of each score],
+# "bans": [banned diff ids], "stages": {"scores": True, ...}}
+#the stages are done in this order, and each one is checkpointed for every match it covered once it's written;
+#a match is completely added once all of them are
+ingest_stages = ("scores", "players", "teams", "matches", "maps", "ranks")
+
 async def getval(key, value, db='test', collection='test-data'):
     """Find and return the MongoDB document with key:value in db[collection]."""
     db = client[db]
@@ -289,6 +305,7 @@ async def add_meta(meta_data):
         "active_pool": meta_data[4][1]
     }
     await collection.insert_one(document)
+    db_get.invalidate_meta_cache()
 
 async def add_pools(pool_data):
     """Update the `mappools` database with `pool_data`.
@@ -342,25 +359,26 @@ async def add_pools(pool_data):
                 current_pool_docs = []
                 current_pool_ids = []
         #get and process map data
-        map_data = await osuapi.get_map_data(map[1])
+        map_data = await osuapi.get_map_data(map[1], priority=osuapi.PRIORITY_BULK)
         #print(map_data)
         #note how we do not make any additional calculations to bpm or drain time
         #we can do that elsewhere, not here
         map_document = {
             '_id': map[1],
             'scores': [],
+            'banned_in': [],
             'pool_id': map[3],
             'map_type': map[2],
             'map_url': f'https://osu.ppy.sh/b/{map[1]}',
-            'set_id': map_data["beatmapset_id"],
+            'set_id': map_data.beatmapset_id,
             'meta':{
-                'map_artist': map_data["artist"],
-                'map_song': map_data["title"],
-                'map_diff': map_data["version"],
-                'map_creator': map_data["creator"],
-                'star_rating': map_data["difficultyrating"],
-                'bpm': map_data["bpm"],
-                'drain_time': map_data["total_length"],
+                'map_artist': map_data.artist,
+                'map_song': map_data.title,
+                'map_diff': map_data.version,
+                'map_creator': map_data.creator,
+                'star_rating': map_data.difficultyrating,
+                'bpm': map_data.bpm,
+                'drain_time': map_data.total_length,
             },
             'stats':{
                 'picks': 0,
@@ -376,8 +394,10 @@ async def add_pools(pool_data):
     #add metadata docs
     meta_collection = db['meta']
     await meta_collection.insert_many(meta_docs)
+    db_get.invalidate_meta_cache()
+    await db_get.refresh_pool_index()
 
-async def add_players_and_teams(player_data, *, create_index=False):
+async def add_players_and_teams(player_data, *, create_index=False, ctx=None):
     """Update the `tournament_data` database from `player_data`.
     
     *This function is not intended for updating existing players.*
@@ -394,13 +414,18 @@ async def add_players_and_teams(player_data, *, create_index=False):
     for each player is created in the `players` collection.
     
     If this function is used to initialize the player/team database, then
-    `create_index` should be True. This will create indexes on rankable fields
-    (both the rank and the value itself - average_acc *and* acc_rank, for example).
+    `create_index` should be True. This will create the indexes declared for
+    players and teams in `db_indexes.indexes`.
 
     Note that players and teams are initialized with cached statistics, like average score
     and acc, set to zero. Players are treated as unranked if their rank is equal to 0 or they
     have zero scores. This means that after score addition, players should always have their 
-    ranks updated."""
+    ranks updated.
+    
+    Every player is looked up on the osu! API concurrently (still subject to the rate limit in
+    `osuapi`). Players that can't be resolved are left out of their team instead of aborting
+    the whole process; they're returned as a list of `(team_name, username, error)` tuples
+    and, if `ctx` is passed, reported to the channel the command was called in."""
     db = client['players_and_teams']
     team_collection = db['teams']
     player_collection = db['players']
@@ -423,11 +448,28 @@ async def add_players_and_teams(player_data, *, create_index=False):
         "base_contrib": 0.00,
     }
 
+    start = time.monotonic()
+    #resolve every player on every team at once instead of one at a time
+    #gather() keeps the results in the same order as the sheet
+    usernames = [username for team in player_data for username in team[1:] if username]
+    results = await asyncio.gather(*[osuapi.get_player_data(username, priority=osuapi.PRIORITY_BULK)
+                                     for username in usernames], return_exceptions=True)
+    resolved = dict(zip(usernames, results))
+    failed = []
+
     for team in player_data:
         #first, add the new team
-        players = team[1:]
-        player_data = [await osuapi.get_player_data(username) for username in players]
-        player_ids = [player['user_id'] for player in player_data]
+        team_player_data = []
+        for username in team[1:]:
+            if not username:
+                continue
+            result = resolved[username]
+            if isinstance(result, Exception):
+                print(f"Couldn't resolve player {username} of team {team[0]}: {result}")
+                failed.append((team[0], username, result))
+                continue
+            team_player_data.append(result)
+        player_ids = [player.user_id for player in team_player_data]
         team_document = {
             '_id': team[0],
             'name_lower': team[0].lower(),
@@ -462,12 +504,12 @@ async def add_players_and_teams(player_data, *, create_index=False):
         team_documents.append(team_document)
 
         #then iterate over each player id
-        #really we don't do anything with player_data but at least you can expand it easily
+        #really we don't do anything with team_player_data but at least you can expand it easily
         for player_index, player_id in enumerate(player_ids):
             player_document = {
                 "_id": player_id,
-                'user_name': player_data[player_index]['username'],
-                'user_lower': player_data[player_index]['username'].lower(),
+                'user_name': team_player_data[player_index].username,
+                'user_lower': team_player_data[player_index].username.lower(),
                 'team_name': team[0],
                 'pfp_url': f"https://a.ppy.sh/{player_id}",
                 'scores': [],
@@ -500,15 +542,79 @@ async def add_players_and_teams(player_data, *, create_index=False):
                 }
             }
             player_documents.append(player_document)
+    msg = f"resolved {len(usernames)-len(failed)}/{len(usernames)} players in {time.monotonic()-start:.2f}s"
+    if failed:
+        msg += "\ncouldn't resolve: " + ", ".join(f"{username} ({team_name})" for team_name, username, _ in failed)
+    print(msg)
+    if ctx:
+        await ctx.send(msg)
+
     await player_collection.insert_many(player_documents)
     await team_collection.insert_many(team_documents)
+    db_get.invalidate_player_directory()
 
     if create_index:
-        for field in ["average_acc", "average_score", "average_contrib", "acc_rank", "score_rank",
-                      "contrib_rank", "user_name", "user_lower"]:
-            await player_collection.create_index([(field, -1)])
-        for field in ["average_acc", "average_score", "acc_rank", "score_rank", "name_lower"]:
-            await team_collection.create_index([(field, -1)])
+        await db_indexes.reconcile_indexes("players_and_teams")
+
+    return failed
+
+async def _fetch_match(match, player_id_cache):
+    """Fetch and resolve everything `add_scores()` needs to know about `match`.
+
+    This is the I/O half of processing a match: the osu! API data, the processed games and the
+    pool, map type and bans of each game. Returns `None` if the match has no games in a pool
+    (so there's nothing to add), otherwise `(games, ban_ids)`, where `games` is a list of
+    `(processed_game, pool_name, map_type)` for every game that's in a pool (in match order)
+    and `ban_ids` is the list of banned diff ids."""
+    api_match_data = await osuapi.get_match_data(match[0], priority=osuapi.PRIORITY_BULK)
+    if not api_match_data.games:
+        return None
+
+    #ignoring maps if they are either not in pool or explicitly ignored
+    #this wasn't tested before committing!!! if something breaks on next rebuild
+    #blame it on this right here
+    ignore_indexes = [int(map_index) for map_index in match[5].split(",")] if match[5] else []
+    indexes = [index for index in range(len(api_match_data.games)) if index not in ignore_indexes]
+    #every game in this match is processed at once, which resolves all of its maps and players together
+    processed_games = await osuapi.process_full_match(match[0], data=api_match_data, indexes=indexes,
+                                                      player_ids=player_id_cache, priority=osuapi.PRIORITY_BULK)
+
+    pool_names = await asyncio.gather(*[db_get.determine_pool(processed["diff_id"]) for processed in processed_games])
+    #maps that aren't in the pool don't go any further
+    pooled = [(processed, pool_name) for processed, pool_name in zip(processed_games, pool_names) if pool_name]
+    if not pooled:
+        return None
+
+    #bans are resolved against the pool of the first pooled map, since that's the only way we know
+    #which pool this match was played in
+    pool_name = pooled[0][1]
+    ban_shorthands = [str(banned_id) for banned_id in match[4].split(",")] if match[4] else []
+    map_documents = await asyncio.gather(*[db_get.get_map_document(ban_shorthand, pool_name) for ban_shorthand in ban_shorthands],
+                                         *[db_get.get_map_document(processed["diff_id"], pool_name) for processed, pool_name in pooled])
+    ban_ids = [map_document["_id"] for map_document in map_documents[:len(ban_shorthands)]]
+    games = [(processed, pool_name, map_document["map_type"])
+             for (processed, pool_name), map_document in zip(pooled, map_documents[len(ban_shorthands):])]
+    return games, ban_ids
+
+async def _fetch_matches(matches_data, player_id_cache):
+    """Yield `(match, _fetch_match(match))` for each match in `matches_data`, in order.
+
+    Up to `ingest_concurrency` matches are fetched at once. A match is only started once there's
+    room for it, so no more than that many fetched matches are ever waiting to be consumed."""
+    pending = collections.deque()
+    try:
+        for match in matches_data:
+            pending.append((match, asyncio.ensure_future(_fetch_match(match, player_id_cache))))
+            if len(pending) >= ingest_concurrency:
+                match, task = pending.popleft()
+                yield match, await task
+        while pending:
+            match, task = pending.popleft()
+            yield match, await task
+    finally:
+        #if a match failed (or the consumer stopped early), don't leave the rest running
+        for _, task in pending:
+            task.cancel()
 
 async def add_scores(matches_data, *, create_index=False, ctx=None):
     """Update literally everything related to scores.
@@ -532,13 +638,16 @@ async def add_scores(matches_data, *, create_index=False, ctx=None):
     separated string ("0,1,3", for example).
 
     If this function is used to initialize the score/match database, then
-    `create_index` should be True. This will create an index on the "score"
-    field. (Since the _ids of scores per match/map/player/etc are stored, we
-    only index by score here, not a compound index)
+    `create_index` should be True. This will create the indexes declared for
+    scores in `db_indexes.indexes`.
 
     If desired, `ctx` can be passed to send messages to the Discord channel where
     the command was called.
 
+    Progress is journaled per match (see `ingest_stages`), so this is safe to run again
+    after it's interrupted: matches that were completely added are skipped, and the rest
+    pick up from the last stage that finished without counting anything twice.
+
     As of now, this function is designed exclusively for tournament matches. Attempting
     to use this function for non-tournament matches will fail.
     """
@@ -556,57 +665,50 @@ async def add_scores(matches_data, *, create_index=False, ctx=None):
     # - Update player docs with new stats.
     # - Get a list of unique team docs from the players.
     # - Update team docs with new stats.
+    db = client["matches_and_scores"]
+    score_collection = db["scores"]
+    journal = db["ingest_journal"]
+
+    entries = await _load_journal([match[0] for match in matches_data])
+    #matches that were already completely added are skipped outright
+    skipped = len([match for match in matches_data if _ingest_done(entries.get(match[0]))])
+    matches_data = [match for match in matches_data if not _ingest_done(entries.get(match[0]))]
+    if skipped:
+        print(f"skipping {skipped} matches that were already added")
+        if ctx:
+            await ctx.send(f"skipping {skipped} matches that were already added")
+    if not matches_data:
+        return
+
     player_id_cache = {} #we use one global cache for this entire process
 
-    #to be batch uploaded upon completion
-    score_documents = []
-    #{"mp_id": [score_document, ...], ...}
-    # no need to be a defaultdict since all valid docs are added at once
+    #{"mp_id": [score_document, ...], ...}, in the order of `matches_data`
     matches_documents = {}
-    #{"team_name": [score_document, ...], ...}
-    team_documents = collections.defaultdict(list)
-    #{"player_id": [score_document, ...], ...}
-    player_documents = collections.defaultdict(list)
-    #{"diff_id": [score_document, ...], ...}
-    map_documents = collections.defaultdict(list)
-    #{"diff_id": <ban count as `int`>}
-    ban_documents = collections.defaultdict(int)
-    for match in matches_data:
-        api_match_data = await osuapi.get_match_data(match[0])
-        if not api_match_data['games']:
+    #{"score_id": "team_name"}
+    team_names = {}
+    #{"mp_id": [banned diff id, ...]}
+    match_bans = {}
+
+    #matches whose scores were already written are picked back up from the database, everything else is fetched
+    resumed = [match[0] for match in matches_data if match[0] in entries and entries[match[0]]["stages"].get("scores")]
+    stored = {}
+    if resumed:
+        score_ids = [score_id for match_id in resumed for score_id in entries[match_id]["scores"]]
+        cursor = score_collection.find({'_id': {'$in': score_ids}})
+        stored = {score_document["_id"]: score_document for score_document in await cursor.to_list(length=None)}
+    to_fetch = [match for match in matches_data if match[0] not in resumed]
+
+    fetched_documents = {}
+    #matches are fetched concurrently (see `_fetch_matches()`), but always consumed in
+    #the order of `matches_data`, so the documents come out the same as doing one at a time
+    async for match, fetched in _fetch_matches(to_fetch, player_id_cache):
+        if fetched is None:
             continue
+        games, ban_ids = fetched
 
         match_documents = []
-        #we don't determine the pool name until we're inside the for loop
-        #which is why processing this match's bans ended up inside
-        #i can't think of any better alternatives that wouldn't do the same pool-finding process anyways
-        bans_processed = False
-
-        for index, game_data in enumerate(api_match_data["games"]):
-            #ignoring maps if they are either not in pool or explicitly ignored
-            #this wasn't tested before committing!!! if something breaks on next rebuild
-            #blame it on this right here
-            if index in [int(map_index) for map_index in match[5].split(",")]:
-                continue
-            processed = await osuapi.process_match_data(match[0], index, data=api_match_data, player_ids=player_id_cache)
-            if processed == None:
-                continue
-            player_id_cache = processed["player_ids"]
-            pool_name = await db_get.determine_pool(processed["diff_id"])
-            #this map isn't in the pool; don't go any further
-            if not pool_name:
-                continue
-            
-            #process bans
-            if not bans_processed:
-                for ban_shorthand in [str(banned_id) for banned_id in match[4].split(",")]:
-                    #print(f"Processing {ban_shorthand} for {pool_name} (stage {match[3]}, id {match[0]})")
-                    ban_id = (await db_get.get_map_document(ban_shorthand, pool_name))["_id"]
-                    #print(f"was resolved to {ban_id}")
-                    ban_documents[ban_id] += 1
-                    bans_processed = True
-
-            map_type = (await db_get.get_map_document(processed["diff_id"], pool_name))["map_type"]
+        for processed, pool_name, map_type in games:
+            index = processed["match_index"]
             #oh my god the function complexity lol
             for score in processed["individual_scores"]:
                 #this format is theoretically always unique and can yield score information in itself
@@ -648,53 +750,166 @@ async def add_scores(matches_data, *, create_index=False, ctx=None):
                     "stage": match[3]
                 }
 
-                score_documents.append(score_document)
                 match_documents.append(score_document)
+                team_names[id] = score['team_name']
+        fetched_documents[match[0]] = match_documents
+        match_bans[match[0]] = ban_ids
+
+    for match in matches_data:
+        if match[0] in fetched_documents:
+            matches_documents[match[0]] = fetched_documents[match[0]]
+        elif match[0] in resumed:
+            entry = entries[match[0]]
+            matches_documents[match[0]] = [stored[score_id] for score_id in entry["scores"]]
+            team_names.update(zip(entry["scores"], entry["team_names"]))
+            match_bans[match[0]] = entry["bans"]
+
+    #matches that were interrupted before their scores were checkpointed
+    interrupted = [match_id for match_id in fetched_documents if match_id in entries]
+    #the journal entries of fetched matches are (re)written before any of their scores are,
+    #so that the scores can always be found again
+    requests = []
+    for match_id in fetched_documents:
+        score_ids = [score_document["_id"] for score_document in fetched_documents[match_id]]
+        entries[match_id] = {
+            "_id": match_id,
+            "scores": score_ids,
+            "team_names": [team_names[score_id] for score_id in score_ids],
+            "bans": match_bans[match_id],
+            "stages": {}
+        }
+        requests.append(pymongo.ReplaceOne({'_id': match_id}, entries[match_id], upsert=True))
+    if requests:
+        await journal.bulk_write(requests)
+
+    def stage_matches(stage):
+        """The ids of the matches that still need `stage`."""
+        return [match_id for match_id in matches_documents if not entries[match_id]["stages"].get(stage)]
+
+    async def checkpoint(stage, match_ids):
+        """Mark `stage` as done for `match_ids`."""
+        if match_ids:
+            await journal.update_many({'_id': {'$in': match_ids}}, {'$set': {f'stages.{stage}': True}})
+        for match_id in match_ids:
+            entries[match_id]["stages"][stage] = True
 
-                player_documents[score['user_id']].append(score_document)
-                team_documents[score['team_name']].append(score_document)
-                map_documents[processed['diff_id']].append(score_document)
-        '''
-        import pprint
-        print(f"for id {match[0]}:")
-        pprint.pprint(api_match_data)
-        print(api_match_data["match"])
-        print(api_match_data["match"]["match_id"])
-        print(match[0])
-        '''
-        matches_documents[match[0]] = match_documents
-    '''
-    import pprint
-    pprint.pprint(matches_documents)
-    pprint.pprint(team_documents)
-    '''
-
-    score_db = client["matches_and_scores"]
-    score_collection = score_db["scores"]
-    
     if ctx:
         await ctx.send("finishing up score insertion (7/12)")
-    await score_collection.insert_many(score_documents)
+    match_ids = stage_matches("scores")
+    score_documents = [score_document for match_id in match_ids for score_document in matches_documents[match_id]]
+    if score_documents:
+        #upserted, so that scores written by an interrupted run are just overwritten
+        await score_collection.bulk_write([pymongo.ReplaceOne({'_id': score_document["_id"]}, score_document, upsert=True)
+                                           for score_document in score_documents])
+    if interrupted:
+        #some of these scores may already be on the leaderboards, so they're rebuilt instead
+        db_get.invalidate_leaderboards(score_collection.full_name)
+    else:
+        #the tournament-wide score leaderboards are patched instead of being rebuilt from scratch
+        db_get.add_scores_to_leaderboards(score_documents)
+    await checkpoint("scores", match_ids)
     #supposedly index creation after inserting data is faster so it's after the fx above    
     if create_index:
-        #descending: all scores
-        await score_collection.create_index([("score", -1)])
+        await db_indexes.reconcile_indexes("matches_and_scores")
 
     if ctx:
         await ctx.send("updating player stats (8/12)")
+    match_ids = stage_matches("players")
+    #{"player_id": [score_document, ...], ...}
+    player_documents = collections.defaultdict(list)
+    for match_id in match_ids:
+        for score_document in matches_documents[match_id]:
+            player_documents[score_document['user_id']].append(score_document)
     await update_player_stats(player_documents)
+    await checkpoint("players", match_ids)
+
     if ctx:
         await ctx.send("updating team stats (9/12)")
+    match_ids = stage_matches("teams")
+    #{"team_name": [score_document, ...], ...}
+    team_documents = collections.defaultdict(list)
+    for match_id in match_ids:
+        for score_document in matches_documents[match_id]:
+            team_documents[team_names[score_document['_id']]].append(score_document)
     await update_team_stats(team_documents)
+    await checkpoint("teams", match_ids)
+
     if ctx:
         await ctx.send("updating match stats (10/12)")
-    await create_match_stats(matches_documents)
+    match_ids = stage_matches("matches")
+    await create_match_stats({match_id: matches_documents[match_id] for match_id in match_ids})
+    await checkpoint("matches", match_ids)
+
     if ctx:
         await ctx.send("updating map stats (11/12)")
+    match_ids = stage_matches("maps")
+    #{"diff_id": [score_document, ...], ...}
+    map_documents = collections.defaultdict(list)
+    #{"diff_id": {"mp_id": <ban count as `int`>}}
+    ban_documents = collections.defaultdict(lambda: collections.defaultdict(int))
+    for match_id in match_ids:
+        for ban_id in match_bans[match_id]:
+            ban_documents[ban_id][match_id] += 1
+        for score_document in matches_documents[match_id]:
+            map_documents[score_document['diff_id']].append(score_document)
     await update_map_stats(map_documents, ban_documents)
+    await checkpoint("maps", match_ids)
+
     if ctx:
         await ctx.send("updating ranks (12/12)")
-    await update_ranks()
+    match_ids = stage_matches("ranks")
+    if match_ids:
+        await update_ranks()
+    await checkpoint("ranks", match_ids)
+
+async def _load_journal(match_ids):
+    """Get the ingestion journal entries of `match_ids`, as `{match_id: entry}`.
+    
+    Matches that were added before there was a journal (they have a Match document, but no
+    entry) get a stand-in entry with every stage done. Matches that were never added aren't included."""
+    db = client["matches_and_scores"]
+    cursor = db["ingest_journal"].find({'_id': {'$in': match_ids}})
+    entries = {entry["_id"]: entry for entry in await cursor.to_list(length=None)}
+    unjournaled = [match_id for match_id in match_ids if match_id not in entries]
+    if unjournaled:
+        cursor = db["matches"].find({'_id': {'$in': unjournaled}}, {'_id': 1})
+        for match_document in await cursor.to_list(length=None):
+            entries[match_document["_id"]] = {"_id": match_document["_id"], "stages": dict.fromkeys(ingest_stages, True)}
+    return entries
+
+def _ingest_done(entry):
+    """Returns True if the journal entry `entry` (which may be `None`) has every stage done."""
+    return entry is not None and all(entry["stages"].get(stage) for stage in ingest_stages)
+
+async def get_ingest_status(match_id):
+    """Find out how far `add_scores()` got with `match_id`.
+    
+    Returns `None` if it was never added, `"partial"` if adding it was interrupted
+    (running `add_scores()` again will finish it) and `"done"` if it was completely added."""
+    entry = (await _load_journal([match_id])).get(match_id)
+    if entry is None:
+        return None
+    return "done" if _ingest_done(entry) else "partial"
+
+def _by_match(scores):
+    """Split the Score documents `scores` into `{match_id: [score_document, ...]}`."""
+    output = collections.defaultdict(list)
+    for score in scores:
+        output[score['match_id']].append(score)
+    return output
+
+async def _report_missing(collection, ids, result, expected, kind):
+    """Print the ids in `ids` that a `bulk_write()` of `expected` updates didn't find.
+    
+    (Updates skipped because they were already applied also count as not matched, so this
+    only means that something might be missing.)"""
+    if result.matched_count == expected:
+        return
+    cursor = collection.find({'_id': {'$in': ids}}, {'_id': 1})
+    found = {document["_id"] for document in await cursor.to_list(length=None)}
+    for id in ids:
+        if id not in found:
+            print(f"Lookup for {kind} {id} failed!!")
 
 async def update_player_stats(player_dict):
     """Update player statistics.
@@ -708,68 +923,67 @@ async def update_player_stats(player_dict):
 
     Players that can't be found based on ID are ignored.
     
+    The sums and counts are `$inc`-ed and the new score ids `$push`-ed on the server,
+    and then the averages are recalculated from the stored sums - all in one `bulk_write()`.
+    This is done one match at a time, and a match is skipped for players that already have
+    its scores, so running this again with some of the same scores doesn't count them twice.
+    
     Cached ranks should be recalculated following individual score addition."""
     db = client['players_and_teams']
     player_collection = db['players']
+    requests = []
+    #the number of updates that should match, for `_report_missing()`
+    expected = 0
     for player_id in player_dict:
-        player_document = await player_collection.find_one({'_id': player_id})
-        if player_document == None:
-            print(f"Lookup for player {player_id} failed!!")
-            pprint.pprint(player_dict[player_id])
-            continue
-        stat = player_document['cached']
-
-        for score in player_dict[player_id]:
-            stat['base_acc'] += score['accuracy']
-            stat['base_score'] += score['score']
-            stat['base_contrib'] += score['contrib']
-            stat['maps_played'] += 1
-            #i highly doubt we will ever encounter a tie but 
-            #it's treated as neither a loss nor a win
-            if score['score_difference'] > 0:
-                stat['maps_won'] += 1
-            elif score['score_difference'] < 0:
-                stat['maps_lost'] += 1
-            stat['hits']['300_count'] += score['hits']['300_count']
-            stat['hits']['100_count'] += score['hits']['100_count']
-            stat['hits']['50_count'] += score['hits']['50_count']
-            stat['hits']['miss_count'] += score['hits']['miss_count']
-
-            #per-mod stat changes
-            if score['map_type'] == "TB":
-                mod_stat = stat['by_mod']["FM"]
-            else:
-                mod_stat = stat['by_mod'][score['map_type']]
-            mod_stat['base_acc'] += score['accuracy']
-            mod_stat['base_score'] += score['score']
-            mod_stat['base_contrib'] += score['contrib']
-            
-            mod_stat['maps_played'] += 1
-            if score['score_difference'] > 0:
-                mod_stat['maps_won'] += 1
-            elif score['score_difference'] < 0:
-                mod_stat['maps_lost'] += 1
+        mods_played = set()
+        for match_scores in _by_match(player_dict[player_id]).values():
+            increments = collections.defaultdict(int)
+            for score in match_scores:
+                increments['cached.base_acc'] += score['accuracy']
+                increments['cached.base_score'] += score['score']
+                increments['cached.base_contrib'] += score['contrib']
+                increments['cached.maps_played'] += 1
+                #i highly doubt we will ever encounter a tie but 
+                #it's treated as neither a loss nor a win
+                if score['score_difference'] > 0:
+                    increments['cached.maps_won'] += 1
+                elif score['score_difference'] < 0:
+                    increments['cached.maps_lost'] += 1
+                for hit in ['300_count', '100_count', '50_count', 'miss_count']:
+                    increments[f'cached.hits.{hit}'] += score['hits'][hit]
+
+                #per-mod stat changes
+                mod = "FM" if score['map_type'] == "TB" else score['map_type']
+                mods_played.add(mod)
+                increments[f'cached.by_mod.{mod}.base_acc'] += score['accuracy']
+                increments[f'cached.by_mod.{mod}.base_score'] += score['score']
+                increments[f'cached.by_mod.{mod}.base_contrib'] += score['contrib']
+                increments[f'cached.by_mod.{mod}.maps_played'] += 1
+                if score['score_difference'] > 0:
+                    increments[f'cached.by_mod.{mod}.maps_won'] += 1
+                elif score['score_difference'] < 0:
+                    increments[f'cached.by_mod.{mod}.maps_lost'] += 1
 
             #and add to the player's list of scores
-            player_document['scores'].append(score['_id'])
-        
-        #recalculate baselines back to an average
-        stat['average_acc'] = stat['base_acc'] / stat['maps_played'] 
-        stat['average_score'] = stat['base_score'] / stat['maps_played'] 
-        stat['average_contrib'] = stat['base_contrib'] / stat['maps_played']
-
-        #then for mods as well
-        for mod in stat['by_mod']:
-            mod_stat = stat['by_mod'][mod]
-            if mod_stat['maps_played'] != 0:
-                mod_stat['average_acc'] = mod_stat['base_acc'] / mod_stat['maps_played'] 
-                mod_stat['average_score'] = mod_stat['base_score'] / mod_stat['maps_played'] 
-                mod_stat['average_contrib'] = mod_stat['base_contrib'] / mod_stat['maps_played'] 
-
-        #pprint.pprint(player_document)
-        
-        #and update the player document
-        await player_collection.replace_one({'_id': player_id}, player_document)
+            #(unless this match's scores are already there, in which case this was done by an interrupted add_scores())
+            score_ids = [score['_id'] for score in match_scores]
+            requests.append(pymongo.UpdateOne({'_id': player_id, 'scores': {'$nin': score_ids}}, {
+                '$inc': dict(increments),
+                '$push': {'scores': {'$each': score_ids}}
+            }))
+            expected += 1
+
+        #recalculate baselines back to an average (for the mods that changed, too)
+        averages = {}
+        for prefix in ['cached']+[f'cached.by_mod.{mod}' for mod in mods_played]:
+            for stat in ['acc', 'score', 'contrib']:
+                averages[f'{prefix}.average_{stat}'] = {'$divide': [f'${prefix}.base_{stat}', f'${prefix}.maps_played']}
+        requests.append(pymongo.UpdateOne({'_id': player_id}, [{'$set': averages}]))
+        expected += 1
+
+    if requests:
+        result = await player_collection.bulk_write(requests)
+        await _report_missing(player_collection, list(player_dict), result, expected, "player")
 
 async def update_team_stats(team_dict):
     """Update team statistics.
@@ -781,73 +995,63 @@ async def update_team_stats(team_dict):
     accordingly. Note that statistics are not cached for individual
     mods.
     
+    Like `update_player_stats()`, this is done with server-side updates in one `bulk_write()`,
+    one match at a time, and matches whose scores a team already has are skipped for that team.
+    
     Cached ranks should be recalculated following individual score addition."""
     db = client['players_and_teams']
     team_collection = db['teams']
+    requests = []
+    expected = 0
     for team_name in team_dict:
-        team_document = await team_collection.find_one({'_id': team_name})
-        if team_document == None:
-            print(f"Lookup for team {team_name} failed!!")
-            pprint.pprint(team_dict[team_name])
-            continue
-        processed_maps = []
-        stat = team_document['cached']
-        #theoretically no need to call every single score that's already stored in the player's document
-
-        for score in team_dict[team_name]:
-            #main
-            stat['base_acc'] += score['accuracy']
-            stat['base_score'] += score['score']
-            stat['total_scores'] += 1 #usually two per map
-            if score['match_id']+str(score['match_index']) not in processed_maps:
-                #only one per map
-                stat['maps_played'] += 1
-                if score['score_difference'] > 0:
-                    stat['maps_won'] += 1
-                elif score['score_difference'] < 0:
-                    stat['maps_lost'] += 1
-            stat['hits']['300_count'] += score['hits']['300_count']
-            stat['hits']['100_count'] += score['hits']['100_count']
-            stat['hits']['50_count'] += score['hits']['50_count']
-            stat['hits']['miss_count'] += score['hits']['miss_count']
-
-            #per-mod stat changes
-            if score['map_type'] == "TB":
-                mod_stat = stat['by_mod']["FM"]
-            else:
-                mod_stat = stat['by_mod'][score['map_type']]
-            mod_stat['base_acc'] += score['accuracy']
-            mod_stat['base_score'] += score['score']
-            mod_stat['total_scores'] += 1
-            
-            if score['match_id']+str(score['match_index']) not in processed_maps:
-                mod_stat['maps_played'] += 1
-                if score['score_difference'] > 0:
-                    mod_stat['maps_won'] += 1
-                elif score['score_difference'] < 0:
-                    mod_stat['maps_lost'] += 1
-                #formatted match_id-match_index, always unique per individual map played
-                processed_maps.append(score['match_id']+str(score['match_index']))
+        mods_played = set()
+        for match_scores in _by_match(team_dict[team_name]).values():
+            #formatted match_id-match_index, always unique per individual map played
+            processed_maps = set()
+            increments = collections.defaultdict(int)
+            for score in match_scores:
+                mod = "FM" if score['map_type'] == "TB" else score['map_type']
+                mods_played.add(mod)
+                #main
+                increments['cached.base_acc'] += score['accuracy']
+                increments['cached.base_score'] += score['score']
+                increments['cached.total_scores'] += 1 #usually two per map
+                increments[f'cached.by_mod.{mod}.base_acc'] += score['accuracy']
+                increments[f'cached.by_mod.{mod}.base_score'] += score['score']
+                increments[f'cached.by_mod.{mod}.total_scores'] += 1
+                for hit in ['300_count', '100_count', '50_count', 'miss_count']:
+                    increments[f'cached.hits.{hit}'] += score['hits'][hit]
+
+                if score['match_id']+str(score['match_index']) not in processed_maps:
+                    #only one per map
+                    processed_maps.add(score['match_id']+str(score['match_index']))
+                    for prefix in ['cached', f'cached.by_mod.{mod}']:
+                        increments[f'{prefix}.maps_played'] += 1
+                        if score['score_difference'] > 0:
+                            increments[f'{prefix}.maps_won'] += 1
+                        elif score['score_difference'] < 0:
+                            increments[f'{prefix}.maps_lost'] += 1
+
+            #add score ids (if this match's aren't already there, like in update_player_stats())
+            score_ids = [score['_id'] for score in match_scores]
+            requests.append(pymongo.UpdateOne({'_id': team_name, 'scores': {'$nin': score_ids}}, {
+                '$inc': dict(increments),
+                '$push': {'scores': {'$each': score_ids}}
+            }))
+            expected += 1
 
-            #add score id 
-            team_document['scores'].append(score['_id'])
-        
         #recalculate baselines back to an average
         #the team size (in an individual map)
-        stat['average_acc'] = stat['base_acc'] / stat['total_scores']
-        stat['average_score'] = stat['base_score'] / stat['total_scores']
+        averages = {}
+        for prefix in ['cached']+[f'cached.by_mod.{mod}' for mod in mods_played]:
+            for stat in ['acc', 'score']:
+                averages[f'{prefix}.average_{stat}'] = {'$divide': [f'${prefix}.base_{stat}', f'${prefix}.total_scores']}
+        requests.append(pymongo.UpdateOne({'_id': team_name}, [{'$set': averages}]))
+        expected += 1
 
-        #then for mods as well
-        for mod in stat['by_mod']:
-            mod_stat = stat['by_mod'][mod]
-            if mod_stat['maps_played'] != 0:
-                mod_stat['average_acc'] = mod_stat['base_acc'] / mod_stat['total_scores'] 
-                mod_stat['average_score'] = mod_stat['base_score'] / mod_stat['total_scores'] 
-
-        #pprint.pprint(team_document)
-        
-        #and update the document
-        await team_collection.replace_one({'_id': team_name}, team_document)
+    if requests:
+        result = await team_collection.bulk_write(requests)
+        await _report_missing(team_collection, list(team_dict), result, expected, "team")
 
 async def update_map_stats(map_dict, ban_dict):
     """Update map statistics.
@@ -855,55 +1059,63 @@ async def update_map_stats(map_dict, ban_dict):
     - `map_dict` is a `dict` of diff ids (as strings) to
     a list of Score documents generated by `add_score()`. Diff ids should be
     identical to the _id of Map documents.
-    - `ban_dict` is a `dict` of diff ids (as strings) to ints representing ban count.
-    For maps that aren't banned (and thus aren't in `ban_dict`), `defaultdict` will return
-    0 for that map anyways.
+    - `ban_dict` is a `dict` of diff ids (as strings) to `dict`s of match ids to ints
+    representing ban count. For maps that aren't banned (and thus aren't in `ban_dict`),
+    `defaultdict` will return an empty `dict` for that map anyways. Only the bans of maps
+    in `map_dict` are counted.
+    
+    Maps don't store their sums, so the new averages are worked out from the old averages
+    and score counts on the server, in the same update as everything else. This is done one
+    match at a time, and a match is skipped for maps that already have its scores (or, for
+    bans, whose `banned_in` already has it). There's one `bulk_write()` per pool collection.
     
     (not implemented: indexing on score?)"""
     db = client['mappools']
+    #{pool: [requests]}
+    pool_requests = collections.defaultdict(list)
+    pool_maps = collections.defaultdict(list)
     for diff_id in map_dict:
-        #here we store the distinct matches, adding it to the pick count at the end
-        unique_match_ids = []
         #collections are split by pool, but fortunately we store the pool in the Score doc
         #we'll just take the first such doc
-        pool_collection = db[map_dict[diff_id][0]["pool"]]
-        map_document = await pool_collection.find_one({'_id': diff_id})
-        if map_document == None:
-            #which means something has gone horribly wrong
-            print(f"Lookup for map {diff_id} failed!!")
-            continue
-        stat = map_document['stats']
-        #theoretically no need to call every single score that's already stored in the player's document
-        baseline_acc = stat['average_acc'] * stat['total_scores']
-        baseline_score = stat['average_score'] * stat['total_scores']
-
-        for score in map_dict[diff_id]:
-            baseline_acc += score['accuracy']
-            baseline_score += score['score']
-            stat['total_scores'] += 1
-            
+        pool = map_dict[diff_id][0]["pool"]
+        pool_maps[pool].append(diff_id)
+        for match_scores in _by_match(map_dict[diff_id]).values():
+            score_count = 0
+            acc_sum = 0
+            score_sum = 0
+            for score in match_scores:
+                acc_sum += score['accuracy']
+                score_sum += score['score']
+                score_count += 1
+
+            score_ids = [score['_id'] for score in match_scores]
+            #every field in a single $set sees the old document, so the averages use the old score count
+            update = {}
+            for stat, stat_sum in [('acc', acc_sum), ('score', score_sum)]:
+                update[f'stats.average_{stat}'] = {'$divide': [
+                    {'$add': [{'$multiply': [f'$stats.average_{stat}', '$stats.total_scores']}, stat_sum]},
+                    {'$add': ['$stats.total_scores', score_count]}
+                ]}
+            update['stats.total_scores'] = {'$add': ['$stats.total_scores', score_count]}
             #technically speaking we could get away with this
             #stat['picks'] += 0.25
             #but if we were to ever change the players per team, or
             #some unexpected thing came up, it would be difficult to fix
-            #so we'll just count the maps instead and work from there
-
-            if score['match_id'] not in unique_match_ids:
-                unique_match_ids.append(score['match_id'])
-
-            map_document['scores'].append(score['_id'])
-        
-        #recalculate baselines back to an average
-        stat['average_acc'] = baseline_acc / stat['total_scores'] 
-        stat['average_score'] = baseline_score / stat['total_scores'] 
-
-        #for maps, add the number of picks (and also update bans)
-        stat['picks'] += len(unique_match_ids)
-        stat['bans'] += ban_dict[diff_id]
-        #pprint.pprint(map_document)
-        
-        #and update the document
-        await pool_collection.replace_one({'_id': diff_id}, map_document)
+            #so we'll just count the matches instead - this is one of them
+            update['stats.picks'] = {'$add': ['$stats.picks', 1]}
+            update['scores'] = {'$concatArrays': ['$scores', score_ids]}
+            pool_requests[pool].append(pymongo.UpdateOne({'_id': diff_id, 'scores': {'$nin': score_ids}}, [{'$set': update}]))
+
+        #for maps, also update bans (once per match, like the scores)
+        for match_id, ban_count in ban_dict[diff_id].items():
+            pool_requests[pool].append(pymongo.UpdateOne({'_id': diff_id, 'banned_in': {'$ne': match_id}}, {
+                '$inc': {'stats.bans': ban_count},
+                '$push': {'banned_in': match_id}
+            }))
+
+    for pool in pool_requests:
+        result = await db[pool].bulk_write(pool_requests[pool])
+        await _report_missing(db[pool], pool_maps[pool], result, len(pool_requests[pool]), "map")
 
 async def create_match_stats(match_dict):
     """Create match documents.
@@ -919,6 +1131,9 @@ async def create_match_stats(match_dict):
     match_collection = db['matches']
     match_docs = []
     for mp_id in match_dict:
+        #every score in the match may have been ignored, in which case there's nothing to create
+        if not match_dict[mp_id]:
+            continue
         match_document = {
             '_id': mp_id,
             'match_name': match_dict[mp_id][0]["match_name"],
@@ -989,52 +1204,86 @@ async def create_match_stats(match_dict):
         
         #add generated doc for batch insert
         match_docs.append(match_document)
-    #actually perform batch insert
-    await match_collection.insert_many(match_docs)
+    #actually perform batch insert (as upserts, in case an interrupted add_scores() already got this far)
+    if match_docs:
+        await match_collection.bulk_write([pymongo.ReplaceOne({'_id': match_document['_id']}, match_document, upsert=True)
+                                           for match_document in match_docs])
+
+async def _rank_requests(collection, fields):
+    """Work out the ranks of every document in `collection` by each field in `fields` ({field: rank field}).
+    
+    Every document is read once, with only the fields needed, and sorted in memory once per field.
+    Returns a list of `UpdateOne`s that `$set` the ranks that changed."""
+    projection = {'cached.maps_played': 1}
+    for field, rank_field in fields.items():
+        projection[f'cached.{field}'] = 1
+        projection[f'cached.{rank_field}'] = 1
+    cursor = collection.find({}, projection)
+    documents = await cursor.to_list(length=None)
+
+    changes = collections.defaultdict(dict)
+    for field, rank_field in fields.items():
+        #ties are broken by _id, like the leaderboards in db_get
+        ordered = sorted(documents, key=lambda document: (document["cached"][field], document["_id"]), reverse=True)
+        for index, document in enumerate(ordered):
+            #if the number of scores for that player or team is equal to zero, it remains unranked
+            if document["cached"]["maps_played"] != 0 and document["cached"][rank_field] != index+1:
+                changes[document["_id"]][f'cached.{rank_field}'] = index+1
+    return [pymongo.UpdateOne({'_id': id}, {'$set': ranks}) for id, ranks in changes.items()]
 
 async def update_ranks():
-    """Iterate through every team and player document and update their ranks.
+    """Update the ranks of every team and player document.
     
-    This is achieved by sorting documents by the required field, converting it to a list,
-    and then using `enumerate()` to determine its position in the list. If the number of scores
-    for that player or team is equal to zero, that team remains unranked."""
-    equivs = {
-        "cached.average_acc": "acc_rank",
-        "cached.average_score": "score_rank",
-        "cached.average_contrib": "contrib_rank"
-    }
+    This is achieved by sorting documents by the required field and using `enumerate()` to
+    determine its position in the list. If the number of scores for that player or team is
+    equal to zero, that team remains unranked.
+    
+    Each collection is read once (only the averages and ranks), and only the ranks that
+    changed are written back, in one `bulk_write()` per collection."""
     db = client["players_and_teams"]
     player_collection = db["players"]
     team_collection = db["teams"]
-    for field in ["cached.average_acc", "cached.average_score", "cached.average_contrib"]:
-        cursor = player_collection.find().sort(field, -1)
-        #i would imagine we never get that many players
-        for index, player_document in enumerate(await cursor.to_list(length=1000)):
-            #pprint.pprint(player_document)
-            if player_document["cached"]["maps_played"] != 0:
-                player_document["cached"][equivs[field]] = index+1
-                await player_collection.replace_one({'_id': player_document["_id"]}, player_document)
-    for field in ["cached.average_acc", "cached.average_score"]:
-        cursor = team_collection.find().sort(field, -1)
-        #i would imagine we never get that many teams
-        for index, team_document in enumerate(await cursor.to_list(length=1000)):
-            if team_document["cached"]["maps_played"] != 0:
-                team_document["cached"][equivs[field]] = index+1
-                await team_collection.replace_one({'_id': team_document["_id"]}, team_document)
-
-    #there were some alternate methods, but this is the one i understand best
+    player_requests = await _rank_requests(player_collection, {
+        "average_acc": "acc_rank",
+        "average_score": "score_rank",
+        "average_contrib": "contrib_rank"
+    })
+    if player_requests:
+        await player_collection.bulk_write(player_requests)
+    team_requests = await _rank_requests(team_collection, {
+        "average_acc": "acc_rank",
+        "average_score": "score_rank"
+    })
+    if team_requests:
+        await team_collection.bulk_write(team_requests)
+
+    #every average may have changed, so the player and team leaderboards are rebuilt on next use
+    db_get.invalidate_leaderboards(player_collection.full_name)
+    db_get.invalidate_leaderboards(team_collection.full_name)
 
 async def get_all_gsheet_data(bot, ctx, sheet_id):
     """Get all GSheet data from the target sheet and run the OAuth flow if needed.
     
     While perhaps not the most secure way to be executing the flow, we use Discord for
     the authorization prompt as well as the access code entry. This is why `bot` and `ctx` are
-    needed."""
+    needed.
+    
+    Returns `{range_id: [row, ...]}` for every range in `gsheet.ranges`, with rows parsed into
+    the namedtuples in `gsheet`. The sheet is read through `gsheet.get_sheet_data()`, off the
+    event loop; if there's a saved fixture for `sheet_id` (see `gsheet`), that's used instead and
+    no authorization is needed."""
+    data, fixture_path = gsheet.load_fixture(sheet_id)
+    if data is not None:
+        #so nobody rebuilds from an old copy of the sheet without knowing
+        saved = time.strftime("%Y-%m-%d %H:%M", time.localtime(os.path.getmtime(fixture_path)))
+        msg = f"using the saved copy of the sheet at {fixture_path} (saved {saved}), not the live sheet"
+        print(msg)
+        await ctx.send(msg)
+        return data
+
     #theoretically we'll need this practically never so imports occur here
     #if we find a need to regularly rebuild databases from gsheets, then we can move this out
     import pickle
-    import os.path
-    from googleapiclient.discovery import build
     from google_auth_oauthlib.flow import Flow
     from google.auth.transport.requests import Request
 
@@ -1053,7 +1302,8 @@ async def get_all_gsheet_data(bot, ctx, sheet_id):
 
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
+            #this is a blocking http request, so it goes to another thread too
+            await asyncio.get_event_loop().run_in_executor(None, creds.refresh, Request())
         else:
             #https://google-auth-oauthlib.readthedocs.io/en/latest/reference/google_auth_oauthlib.flow.html#google_auth_oauthlib.flow.Flow.from_client_secrets_file
             #creates the flow instance
@@ -1096,7 +1346,7 @@ async def get_all_gsheet_data(bot, ctx, sheet_id):
                 return None
             else:
                 if await prompts.confirmation_dialog(bot, ctx, f"Are you **SURE** this is the correct token?\n{msg.content}"):
-                    flow.fetch_token(code=msg.content)
+                    await asyncio.get_event_loop().run_in_executor(None, functools.partial(flow.fetch_token, code=msg.content))
                     await ctx.send("The authorization process succeded; you should start seeing more msgs now")
                 else:
                     await auth_channel.send("Ok. Start over.")
@@ -1111,72 +1361,71 @@ async def get_all_gsheet_data(bot, ctx, sheet_id):
         with open('token.pickle', 'wb') as token:
             pickle.dump(creds, token)
 
-    #https://googleapis.github.io/google-api-python-client/docs/epy/googleapiclient.discovery-module.html#build
-    #creds should be of type google.auth.credentials.Credentials, which is returned by flow.credentials
-    service = build('sheets', 'v4', credentials=creds)
-
-    # Call the Sheets API
-    sheet = service.spreadsheets()
+    return await gsheet.get_sheet_data(creds, sheet_id)
 
-    output = {}
-
-    ranges = {
-        'meta': 'meta!A2:B',
-        'matches': 'matches!A2:F',
-        'pools': 'pools!A2:D',
-        'teams': 'teams!A2:E'
-    }
-
-    for range_id in ranges:
-        range_name = ranges[range_id]
-        result = sheet.values().get(spreadsheetId=sheet_id,
-                                    range=range_name).execute()
-        output[range_id] = result.get('values', [])
-
-        '''
-        print("for %s:"%range)
-        if not values:
-            print('No data found.')
-        else:
-            for row in values:
-                print(row)
-        '''
-    return output
-
-async def rebuild_all(bot, ctx, sheet_id):
+async def rebuild_all(bot, ctx, sheet_id, *, resume=False):
     """Drops ALL non-test databases, then rebuilds them using gsheet data.
     
-    This DOES NOT drop the discord_users database."""
-    databases = ['mappools', 'players_and_teams', 'tournament_data', 'matches_and_scores']
+    This DOES NOT drop the discord_users database.
+
+    If `resume` is True and an earlier rebuild from the same `sheet_id` was interrupted, nothing is
+    dropped; the steps that finished (checkpointed in `matches_and_scores.rebuild_journal`) are
+    skipped, the one that was interrupted is redone from scratch and `add_scores()` picks up
+    where it left off. Otherwise, this is a normal rebuild."""
+    #the journals live in matches_and_scores, so it's dropped first - if this is interrupted
+    #while dropping, there's no journal left to resume from and the next rebuild starts over
+    databases = ['matches_and_scores', 'mappools', 'players_and_teams', 'tournament_data']
+    rebuild_journal = client['matches_and_scores']['rebuild_journal']
     #total number of steps because i'm lazy
     steps = 12
-    await ctx.send(f"dropping databases... (1/{steps})")
-    for database in databases:
-        await client.drop_database(database)
-        print("dropped %s"%database)
+    entry = await rebuild_journal.find_one({'_id': sheet_id}) if resume else None
+    if entry is None:
+        await ctx.send(f"dropping databases... (1/{steps})")
+        for database in databases:
+            await client.drop_database(database)
+            print("dropped %s"%database)
+        await rebuild_journal.insert_one({'_id': sheet_id, 'stages': {}})
+        stages = {}
+    else:
+        await ctx.send(f"resuming the last rebuild (1/{steps})")
+        stages = entry['stages']
+    #the pools and players are gone, so don't let anything resolve to them until they're re-added
+    db_get.invalidate_pool_index()
+    db_get.invalidate_player_directory()
+    db_get.invalidate_leaderboards()
+    db_get.invalidate_meta_cache()
     await ctx.send(f"getting gsheet info... (2/{steps})")
     data = await get_all_gsheet_data(bot, ctx, sheet_id)
-    await ctx.send(f"building meta db (3/{steps})")
-    await add_meta(data['meta'])
-    await ctx.send(f"building mappool db (4/{steps})")
-    await add_pools(data['pools'])
-    await ctx.send(f"building team and player db (5/{steps})")
-    await add_players_and_teams(data['teams'], create_index=True)
+
+    async def run_stage(stage, database, message, build):
+        """Run `build()` unless `stage` is already done, dropping whatever it left in `database` first."""
+        if stages.get(stage):
+            await ctx.send(f"{message} - already done")
+            return
+        await ctx.send(message)
+        if entry is not None:
+            await client.drop_database(database)
+        await build()
+        await rebuild_journal.update_one({'_id': sheet_id}, {'$set': {f'stages.{stage}': True}})
+
+    async def build_pools():
+        await add_pools(data['pools'])
+        await db_indexes.reconcile_indexes("mappools")
+
+    await run_stage("meta", "tournament_data", f"building meta db (3/{steps})",
+                    lambda: add_meta(data['meta']))
+    await run_stage("pools", "mappools", f"building mappool db (4/{steps})", build_pools)
+    await run_stage("players", "players_and_teams", f"building team and player db (5/{steps})",
+                    lambda: add_players_and_teams(data['teams'], create_index=True, ctx=ctx))
     await ctx.send(f"building scores (6/{steps}) - this will take a while")
     await add_scores(data['matches'], create_index=True, ctx=ctx)
     await ctx.send("done!!")
 
 #async def rebuild_single()
 
-async def create_discord_user(id):
-    """Initialize a new DiscordUser document.
-    
-    Technically, also creates the discord_users collection and db if not
-    already created."""
-    db = client['discord_users']
-    collection = db['discord_users']
-
-    document = {
+def new_discord_user_document(id):
+    """Make an empty DiscordUser document (without inserting it)."""
+    return {
         "_id": id,
         "osu_name": None,
         "osu_id": None,
@@ -1185,10 +1434,23 @@ async def create_discord_user(id):
             "use_images": None
         }
     }
+
+async def create_discord_user(id):
+    """Initialize a new DiscordUser document.
+    
+    Technically, also creates the discord_users collection and db if not
+    already created. (`db_get.get_user_document()` creates documents on its own,
+    so this usually isn't needed.)"""
+    db = client['discord_users']
+    collection = db['discord_users']
+
+    document = new_discord_user_document(id)
     await collection.insert_one(document)
+    db_get.invalidate_user_document(id)
 
 async def update_discord_user(id, document):
     """Update DiscordUser document."""
     db = client['discord_users']
     collection = db['discord_users']
-    await collection.replace_one({'_id': id}, document)
\ No newline at end of file
+    await collection.replace_one({'_id': id}, document)
+    db_get.invalidate_user_document(id)
\ No newline at end of file
@@ -0,0 +1,305 @@
+"""Local stand-in for the osu! API v1 (and its banner assets), for benchmarks and offline testing.
+
+Serves `get_user`, `get_beatmaps` and `get_match` under `/api/`, plus beatmap covers under
+`/beatmaps/<set_id>/covers/cover.jpg`. Point the bot at it with the `osu_api_url` and
+`osu_assets_url` config vars, for example:
+
+```
+python src/fake_osuapi.py --port 8765 --fixtures fixtures --latency 0.08 --error-rate 0.02
+osu_api_url=http://127.0.0.1:8765/api osu_assets_url=http://127.0.0.1:8765 python src/bot.py
+```
+
+Responses come from, in order:
+- fixtures: `<fixtures>/<endpoint>/<param>.json`, where `<param>` is the `u`, `b` or `mp`
+parameter of the request, containing the raw API response.
+- if `--record` is passed, the real API (using the `osu_key` config var); the response is
+saved as a fixture so that later runs are fully offline.
+- if `--synthetic` is passed, generated data. Generated data is deterministic for a given
+parameter, so repeated runs see the same players, maps and scores.
+- otherwise, `[]` (what the real API returns for things that don't exist).
+
+Latency (`--latency`, `--jitter`), random 5xx errors (`--error-rate`) and rate limiting
+(`--rate-limit`, in requests per minute, answered with 429) can be injected to see how the
+bot copes with a slow or unreliable API.
+"""
+import argparse
+import asyncio
+import collections
+import hashlib
+import io
+import json
+import os
+import random
+import time
+
+import aiohttp
+from aiohttp import web
+from PIL import Image
+
+#parameter used to identify the requested object for each endpoint
+endpoint_params = {
+    "get_user": "u",
+    "get_beatmaps": "b",
+    "get_match": "mp",
+}
+
+def seeded(*parts):
+    """A `random.Random` seeded from `parts`, so generated data is the same on every run."""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+def synthetic_user(user):
+    rng = seeded("user", user)
+    user_id = user if user.isdigit() else str(rng.randint(100000, 20000000))
+    username = f"player{user_id}" if user.isdigit() else user
+    return [{
+        "user_id": user_id,
+        "username": username,
+        "join_date": "2015-01-01 00:00:00",
+        "count300": str(rng.randint(10**5, 10**7)),
+        "count100": str(rng.randint(10**4, 10**6)),
+        "count50": str(rng.randint(10**3, 10**5)),
+        "playcount": str(rng.randint(1000, 100000)),
+        "ranked_score": str(rng.randint(10**8, 10**11)),
+        "total_score": str(rng.randint(10**9, 10**12)),
+        "pp_rank": str(rng.randint(1, 10**6)),
+        "level": f"{rng.uniform(50, 105):.5f}",
+        "pp_raw": f"{rng.uniform(500, 12000):.3f}",
+        "accuracy": f"{rng.uniform(90, 99.9):.10f}",
+        "count_rank_ss": str(rng.randint(0, 500)),
+        "count_rank_ssh": str(rng.randint(0, 500)),
+        "count_rank_s": str(rng.randint(0, 2000)),
+        "count_rank_sh": str(rng.randint(0, 2000)),
+        "count_rank_a": str(rng.randint(0, 3000)),
+        "country": "US",
+        "total_seconds_played": str(rng.randint(10**5, 10**7)),
+        "pp_country_rank": str(rng.randint(1, 10**5)),
+        "events": []
+    }]
+
+def synthetic_beatmap(diff_id):
+    rng = seeded("beatmap", diff_id)
+    length = rng.randint(60, 360)
+    return [{
+        "beatmapset_id": str(rng.randint(1, 1500000)),
+        "beatmap_id": diff_id,
+        "approved": rng.choice(["1", "1", "1", "4", "0", "-2"]),
+        "total_length": str(length+rng.randint(0, 20)),
+        "hit_length": str(length),
+        "version": rng.choice(["Insane", "Extra", "Expert", "Another"]),
+        "file_md5": hashlib.md5(diff_id.encode()).hexdigest(),
+        "diff_size": f"{rng.uniform(3, 5):.1f}",
+        "diff_overall": f"{rng.uniform(7, 10):.1f}",
+        "diff_approach": f"{rng.uniform(8, 10):.1f}",
+        "diff_drain": f"{rng.uniform(4, 7):.1f}",
+        "mode": "0",
+        "approved_date": "2019-01-01 00:00:00",
+        "last_update": "2018-12-25 00:00:00",
+        "artist": f"Artist {diff_id}",
+        "title": f"Song {diff_id}",
+        "creator": f"mapper{rng.randint(1, 500)}",
+        "creator_id": str(rng.randint(1, 20000000)),
+        "bpm": str(rng.choice([150, 174, 180, 200, 222])),
+        "source": "",
+        "tags": "",
+        "genre_id": "1",
+        "language_id": "1",
+        "favourite_count": str(rng.randint(0, 5000)),
+        "rating": f"{rng.uniform(8, 10):.4f}",
+        "storyboard": "0",
+        "video": "0",
+        "download_unavailable": "0",
+        "audio_unavailable": "0",
+        "playcount": str(rng.randint(1000, 10**7)),
+        "passcount": str(rng.randint(100, 10**6)),
+        "packs": None,
+        "max_combo": str(rng.randint(500, 3000)),
+        "diff_aim": f"{rng.uniform(2.5, 4):.4f}",
+        "diff_speed": f"{rng.uniform(2.5, 4):.4f}",
+        "difficultyrating": f"{rng.uniform(5, 8):.4f}"
+    }]
+
+def synthetic_match(match_id, *, games, team_size, beatmaps=None, users=None):
+    """A team vs match with `games` games and two teams of `team_size` players each.
+
+    `beatmaps` and `users` are lists of ids to pick from, so generated matches can line up
+    with a real mappool and roster. Otherwise, ids are generated."""
+    rng = seeded("match", match_id)
+    if not users:
+        users = [str(rng.randint(100000, 20000000)) for _ in range(team_size*4)]
+    if not beatmaps:
+        beatmaps = [str(rng.randint(100000, 3000000)) for _ in range(games)]
+    players = rng.sample(users, min(len(users), team_size*2))
+    blue, red = players[:len(players)//2], players[len(players)//2:]
+
+    match_games = []
+    for index in range(games):
+        mods = rng.choice([0, 0, 8, 16, 64, 1])
+        scores = []
+        for slot, user_id in enumerate(blue+red):
+            hits = sum(rng.randint(300, 900) for _ in range(2))
+            count_miss = rng.randint(0, 15)
+            count_50 = rng.randint(0, 10)
+            count_100 = rng.randint(0, hits//10)
+            scores.append({
+                "slot": str(slot),
+                "team": "1" if user_id in blue else "2",
+                "user_id": user_id,
+                "score": str(rng.randint(100000, 1100000)),
+                "maxcombo": str(rng.randint(100, 2000)),
+                "rank": "0",
+                "count50": str(count_50),
+                "count100": str(count_100),
+                "count300": str(hits-count_100-count_50-count_miss),
+                "countmiss": str(count_miss),
+                "countgeki": str(rng.randint(0, 300)),
+                "countkatu": str(rng.randint(0, 100)),
+                "perfect": "0",
+                "pass": "1" if count_miss < 10 else "0",
+                "enabled_mods": None
+            })
+        match_games.append({
+            "game_id": str(10**9+int(seeded("game", match_id, index).random()*10**8)),
+            "start_time": f"2020-11-01 00:{index:02d}:00",
+            "end_time": f"2020-11-01 00:{index:02d}:30",
+            "beatmap_id": beatmaps[index % len(beatmaps)],
+            "play_mode": "0",
+            "match_type": "0",
+            "scoring_type": "3",
+            "team_type": "2",
+            "mods": str(mods),
+            "scores": scores
+        })
+    return {
+        "match": {
+            "match_id": str(match_id),
+            "name": f"FAKE: ({'/'.join(blue)}) vs ({'/'.join(red)})",
+            "start_time": "2020-11-01 00:00:00",
+            "end_time": None
+        },
+        "games": match_games
+    }
+
+def make_banner():
+    """A plain 900x250 jpg, the size of a real beatmap cover."""
+    image = Image.new("RGB", (900, 250), (80, 80, 110))
+    binary = io.BytesIO()
+    image.save(binary, "JPEG")
+    return binary.getvalue()
+
+class FakeOsuApi:
+    def __init__(self, args):
+        self.args = args
+        self.banner = make_banner()
+        self.recent = collections.deque()
+        self.rng = random.Random(args.seed)
+        self.stats = collections.Counter()
+
+    async def inject(self):
+        """Apply the configured latency, rate limit and errors. Returns a response to send instead, if any."""
+        self.stats["requests"] += 1
+        if self.args.latency or self.args.jitter:
+            await asyncio.sleep(max(0, self.args.latency + self.rng.uniform(-self.args.jitter, self.args.jitter)))
+        if self.args.rate_limit:
+            now = time.monotonic()
+            while self.recent and now-self.recent[0] > 60:
+                self.recent.popleft()
+            if len(self.recent) >= self.args.rate_limit:
+                self.stats["rate_limited"] += 1
+                return web.json_response({"error": "rate limited"}, status=429)
+            self.recent.append(now)
+        if self.args.error_rate and self.rng.random() < self.args.error_rate:
+            self.stats["errors"] += 1
+            return web.Response(status=self.rng.choice([500, 502, 503]), text="injected error")
+        return None
+
+    def fixture_path(self, endpoint, param):
+        #usernames can contain spaces and such, keep the file name safe
+        safe = "".join(char if char.isalnum() or char in "-_" else "_" for char in param)
+        return os.path.join(self.args.fixtures, endpoint, f"{safe}.json")
+
+    async def record(self, endpoint, query, path):
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"https://osu.ppy.sh/api/{endpoint}",
+                                   params={**query, "k": os.getenv("osu_key")}) as resp:
+                data = await resp.json()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(data, f)
+        print(f"recorded {path}")
+        return data
+
+    async def api(self, request):
+        injected = await self.inject()
+        if injected is not None:
+            return injected
+        endpoint = request.match_info["endpoint"]
+        if endpoint not in endpoint_params:
+            return web.json_response({"error": "Please provide a valid API key."}, status=404)
+        param = request.query.get(endpoint_params[endpoint], "")
+        path = self.fixture_path(endpoint, param) if self.args.fixtures else None
+
+        if path and os.path.exists(path):
+            self.stats["fixture"] += 1
+            with open(path) as f:
+                return web.json_response(json.load(f))
+        if self.args.record:
+            self.stats["recorded"] += 1
+            query = {key: value for key, value in request.query.items() if key != "k"}
+            return web.json_response(await self.record(endpoint, query, path))
+        if self.args.synthetic and param:
+            self.stats["synthetic"] += 1
+            if endpoint == "get_user":
+                return web.json_response(synthetic_user(param))
+            if endpoint == "get_beatmaps":
+                return web.json_response(synthetic_beatmap(param))
+            return web.json_response(synthetic_match(param, games=self.args.games, team_size=self.args.team_size,
+                                                     beatmaps=self.args.beatmaps, users=self.args.users))
+        self.stats["empty"] += 1
+        if endpoint == "get_match":
+            return web.json_response({"match": 0, "games": []})
+        return web.json_response([])
+
+    async def cover(self, request):
+        injected = await self.inject()
+        if injected is not None:
+            return injected
+        return web.Response(body=self.banner, content_type="image/jpeg")
+
+    async def get_stats(self, request):
+        return web.json_response(dict(self.stats))
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get("/api/{endpoint}", self.api)
+        app.router.add_get("/beatmaps/{set_id}/covers/cover.jpg", self.cover)
+        app.router.add_get("/stats", self.get_stats)
+        return app
+
+def comma_list(value):
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fake osu! API v1 server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=None, help="directory of recorded responses")
+    parser.add_argument("--record", action="store_true", help="fetch and save missing fixtures from the real API")
+    parser.add_argument("--synthetic", action="store_true", help="generate data for anything without a fixture")
+    parser.add_argument("--games", type=int, default=12, help="games per synthetic match")
+    parser.add_argument("--team-size", type=int, default=2, help="players per team in synthetic matches")
+    parser.add_argument("--beatmaps", type=comma_list, default=None, help="diff ids synthetic matches pick from")
+    parser.add_argument("--users", type=comma_list, default=None, help="user ids synthetic matches pick from")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random +/- seconds added to the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 5xx")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per minute before answering 429")
+    parser.add_argument("--seed", type=int, default=0, help="seed for latency jitter and error injection")
+    args = parser.parse_args(argv)
+    if args.record and not args.fixtures:
+        parser.error("--record needs --fixtures")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    web.run_app(FakeOsuApi(args).make_app(), host=args.host, port=args.port)
@@ -0,0 +1,103 @@
+"""Reading the tournament's Google Sheet, for `db_manip.rebuild_all()`.
+
+Every range in `ranges` is fetched with a single `values().batchGet()` request. The Sheets API
+client is synchronous, so the request runs in the default thread executor instead of blocking
+the event loop (and the rest of the bot) while it waits.
+
+Rows are parsed into namedtuples. The API leaves out trailing empty cells, so short rows are padded
+with `""`, and rows that are completely empty are dropped (except in `meta`, where rows are looked
+up by position). Since these are still tuples, `row[0]` works just as well as `row.match_id`.
+
+Cells are kept as `str`, like the sheet shows them, on purpose. Ids (match, referee, diff and
+player ids) are strings in every document and in the osu! API's responses, so converting them
+would only mean converting them back. `bans` and `ignore_indexes` are left as comma-separated
+strings because that's also what `addmatch` takes, and `db_manip._fetch_match()` parses both
+kinds of input in one place.
+
+For offline testing, set the `gsheet_fixtures` config var to a directory. If it contains
+`<sheet_id>.json` (a raw batchGet response), that's used instead of the API, and no authorization
+is needed. Fixtures are only written when `gsheet_record_fixtures` is also "TRUE": then the sheet
+is always fetched from the API, and the response is saved there for later offline runs.
+"""
+import asyncio
+import collections
+import json
+import os
+
+#{range_id: A1 range}
+ranges = {
+    'meta': 'meta!A2:B',
+    'matches': 'matches!A2:F',
+    'pools': 'pools!A2:D',
+    'teams': 'teams!A2:E'
+}
+
+#a key and its value, like ("Full name", "Sample Tournament Knockout")
+MetaRow = collections.namedtuple("MetaRow", ["key", "value"])
+#see `db_manip.add_pools()`
+PoolRow = collections.namedtuple("PoolRow", ["round", "diff_id", "mod", "pool_id"])
+#see `db_manip.add_scores()`
+MatchRow = collections.namedtuple("MatchRow", ["match_id", "referee_id", "referee_name", "stage", "bans",
+                                               "ignore_indexes"])
+#see `db_manip.add_players_and_teams()`; players that aren't there are ""
+TeamRow = collections.namedtuple("TeamRow", ["team_name", "player_1", "player_2", "player_3", "player_4"])
+
+row_models = {
+    'meta': MetaRow,
+    'matches': MatchRow,
+    'pools': PoolRow,
+    'teams': TeamRow
+}
+
+fixtures = os.getenv("gsheet_fixtures")
+record_fixtures = os.getenv("gsheet_record_fixtures") == "TRUE"
+
+def parse_row(model, values):
+    """Make a `model` from the list of cells `values`, padding it with `""` (extra cells are ignored)."""
+    cells = [str(value) for value in values[:len(model._fields)]]
+    return model(*cells, *[""]*(len(model._fields)-len(cells)))
+
+def parse_value_ranges(response):
+    """Parse a batchGet response for `ranges` into `{range_id: [row, ...]}`.
+
+    The value ranges of a batchGet response are in the same order as the requested ranges."""
+    output = {}
+    for range_id, value_range in zip(ranges, response.get('valueRanges', [])):
+        output[range_id] = [parse_row(row_models[range_id], values)
+                            for values in value_range.get('values', []) if any(values) or range_id == 'meta']
+    return output
+
+def _fixture_path(sheet_id):
+    return os.path.join(fixtures, f"{sheet_id}.json")
+
+def load_fixture(sheet_id):
+    """Get the saved sheet data of `sheet_id` (parsed) and the path it was loaded from.
+
+    Returns `(None, None)` if there isn't any, or if fixtures are being recorded."""
+    if not fixtures or record_fixtures or not os.path.exists(_fixture_path(sheet_id)):
+        return None, None
+    with open(_fixture_path(sheet_id)) as fixture:
+        return parse_value_ranges(json.load(fixture)), _fixture_path(sheet_id)
+
+def _batch_get(creds, sheet_id):
+    """Fetch every range in `ranges` from `sheet_id` in one request. This blocks, so it's run in an executor."""
+    #only needed for rebuilds, so it's imported here
+    from googleapiclient.discovery import build
+
+    #https://googleapis.github.io/google-api-python-client/docs/epy/googleapiclient.discovery-module.html#build
+    #creds should be of type google.auth.credentials.Credentials, which is returned by flow.credentials
+    service = build('sheets', 'v4', credentials=creds)
+    return service.spreadsheets().values().batchGet(spreadsheetId=sheet_id,
+                                                    ranges=list(ranges.values())).execute()
+
+async def get_sheet_data(creds, sheet_id):
+    """Fetch and parse every range in `ranges` from `sheet_id`, using the credentials `creds`.
+
+    Returns `{range_id: [row, ...]}`. If fixtures are being recorded, the response is saved."""
+    loop = asyncio.get_event_loop()
+    response = await loop.run_in_executor(None, _batch_get, creds, sheet_id)
+    if fixtures and record_fixtures:
+        os.makedirs(fixtures, exist_ok=True)
+        with open(_fixture_path(sheet_id), 'w') as fixture:
+            json.dump(response, fixture, indent=2)
+    return parse_value_ranges(response)
@@ -1,9 +1,10 @@
 """Handles stored assets in /tmp, which is reset whenever Heroku feels like it"""
 
 import os
-import aiohttp        
 import aiofiles
 
+import osuapi
+
 async def make_tmp():
     """Check if tmp folder exists, create if it doesn't"""
     #git doesn't make empty folders so
@@ -22,17 +23,24 @@ async def make_banner_folder():
         print("making banner dir")
         os.mkdir(banner_dir)
 
+async def download_banner(set_id, banner_fp):
+    """Download the banner of set_id to banner_fp."""
+    await make_banner_folder()
+    #shares the osu! api's pooled session so banners reuse the same connections
+    session = await osuapi.get_session()
+    url = f"{osuapi.assets_url}/beatmaps/{set_id}/covers/cover.jpg"
+    async with session.get(url) as resp:
+        if resp.status == 200:
+            f = await aiofiles.open(banner_fp, mode='wb')
+            await f.write(await resp.read())
+            await f.close()
+            print(f"saved banner of {set_id}")
+
 async def get_banner_fp(set_id):
     """Returns the banner filepath for set_id, retrieving and saving if needed."""
     banner_fp = f"./tmp/map-banners/{set_id}.jpg"
     if not os.path.exists(banner_fp):
-        await make_banner_folder()
-        async with aiohttp.ClientSession() as session:
-            url = f"https://assets.ppy.sh/beatmaps/{set_id}/covers/cover.jpg"
-            async with session.get(url) as resp:
-                if resp.status == 200:
-                    f = await aiofiles.open(banner_fp, mode='wb')
-                    await f.write(await resp.read())
-                    await f.close()
-                    print(f"saved banner of {set_id}")
+        #two renders wanting the same uncached banner share one download
+        #(otherwise both would write to the same file at once)
+        await osuapi.flights.run(f"banner:{set_id}", lambda: download_banner(set_id, banner_fp))
     return banner_fp
\ No newline at end of file
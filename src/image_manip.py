@@ -58,9 +58,9 @@ async def make_team_best(score_docs, current_page, max_page, mod_filter = None):
     draw = ImageDraw.Draw(img)
 
     #header
-    player_doc = await db_get.get_player_document(score_docs[0]["user_id"])
-    team_doc = await db_get.get_team_document(player_doc["team_name"])
-    player_names = [(await db_get.get_player_document(player))["user_name"] for player in team_doc["players"]]
+    player_entry = await db_get.get_player_entry(score_docs[0]["user_id"])
+    team_doc = await db_get.get_team_document(player_entry.team_name, profile="card")
+    player_names = [player.user_name for player in await db_get.get_player_entries(team_doc["players"])]
     draw_std(640, 65, team_doc["_id"], "l") #team name
     draw_std(640, 105, " • ".join(player_names)) #player list
 
@@ -129,7 +129,7 @@ async def make_team_card(team_doc):
     players_str = players_str[:-3] #cut excess bullet point and spaces
     '''
     #same as above, but this is how it originally was before i wrote tb/pb
-    player_names = [(await db_get.get_player_document(player))["user_name"] for player in team_doc["players"]]
+    player_names = [player.user_name for player in await db_get.get_player_entries(team_doc["players"])]
     draw_std(640, 65, team_doc["_id"], "l") #team name
     draw_std(640, 105, " • ".join(player_names)) #players, bullet-separated
 
@@ -240,9 +240,9 @@ async def make_player_best(score_docs, current_page, max_page, mod_filter = None
     draw = ImageDraw.Draw(img)
 
     #header
-    player_doc = await db_get.get_player_document(score_docs[0]["user_id"])
-    draw_std(640, 65, player_doc["user_name"], "l") #player
-    draw_std(640, 105, player_doc["team_name"]) #team name
+    player_entry = await db_get.get_player_entry(score_docs[0]["user_id"])
+    draw_std(640, 65, player_entry.user_name, "l") #player
+    draw_std(640, 105, player_entry.team_name) #team name
 
     #page number
     page_text = f"(page {current_page} of {max_page})" 
@@ -492,7 +492,7 @@ async def make_map_best(score_docs, current_page, max_page, invoker_doc = None):
     if invoker_doc["osu_id"]:
         #get player, get best score, check if rank of best score is already on this page
         #if not, do everything below
-        score, rank, extra_count = await db_get.get_best_user_score(score_docs[0]["diff_id"], invoker_doc["osu_id"])
+        score, rank, extra_count = await db_get.get_best_user_score(score_docs[0]["diff_id"], invoker_doc["osu_id"], profile="row")
         if math.floor(rank/10) != current_page-1:
             y_pos = 645
             draw_std(54, y_pos-39, "...") #ellipsis
@@ -681,7 +681,7 @@ async def make_averagep_best(player_docs, current_page, max_page, category, invo
         draw_std(1063, y_pos, player["team_name"]) 
 
     if invoker_doc["osu_id"]:
-        player_doc = await db_get.get_player_document(invoker_doc["osu_id"])
+        player_doc = await db_get.get_player_document(invoker_doc["osu_id"], profile="card")
         stat = player_doc["cached"]
         header_order = {
             "score":  [comma_sep(stat["average_score"]), percentage(stat["average_acc"]), percentage(stat["average_contrib"])],
@@ -767,7 +767,7 @@ async def make_averaget_best(team_docs, current_page, max_page, category, invoke
         draw_std(648, y_pos, header_order[category][1]) 
 
     if invoker_doc["osu_id"]:
-        team_doc = await db_get.get_team_document(invoker_doc["team_name"])
+        team_doc = await db_get.get_team_document(invoker_doc["team_name"], profile="card")
         stat = team_doc["cached"]
         header_order = {
             "score":  [comma_sep(stat["average_score"]), percentage(stat["average_acc"])],
@@ -155,13 +155,11 @@ class MatchCommands(commands.Cog):
                 if ps[player_id]["team"] == "1":
                     blue_string += player_string
                     if blue_team_name == "Blue Team":
-                        player_doc = await db_get.get_player_document(player_id)
-                        blue_team_name = player_doc["team_name"]
+                        blue_team_name = (await db_get.get_player_entry(player_id)).team_name
                 elif ps[player_id]["team"] == "2":
                     red_string += player_string
                     if red_team_name == "Red Team":
-                        player_doc = await db_get.get_player_document(player_id)
-                        red_team_name = player_doc["team_name"]
+                        red_team_name = (await db_get.get_player_entry(player_id)).team_name
 
             b_t = match_doc["blue_team_stats"]
             r_t = match_doc["red_team_stats"]
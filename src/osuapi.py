@@ -7,12 +7,52 @@ import aiohttp
 from enum import IntFlag
 import os
 import math
+import time
+import asyncio
+import collections
+import itertools
+import numpy as np
 
 import db_manip
 import db_get
+import beatmap_cache
+import apimodels
+from singleflight import SingleFlight
+from ratelimit import RateLimiter, PRIORITY_USER, PRIORITY_BULK
+from resilience import CircuitBreaker, CircuitOpenError, EndpointStats, RetryableError, retry
 
 api_key = os.getenv("osu_key")
 
+#can be pointed at a stand-in (like fake_osuapi.py) for benchmarks and offline testing
+api_url = os.getenv("osu_api_url", "https://osu.ppy.sh/api").rstrip("/")
+assets_url = os.getenv("osu_assets_url", "https://assets.ppy.sh").rstrip("/")
+
+#connection pool settings for the shared session; the defaults are fine for a single dyno
+conn_limit = int(os.getenv("osu_conn_limit", 20))
+conn_limit_per_host = int(os.getenv("osu_conn_limit_per_host", 8))
+dns_cache_ttl = int(os.getenv("osu_dns_cache_ttl", 600))
+keepalive_timeout = int(os.getenv("osu_keepalive_timeout", 60))
+request_timeout = int(os.getenv("osu_request_timeout", 15))
+
+_session = None
+
+#the v1 api allows 1200 requests/minute (bursting to 1400); we keep well under that
+#since the key is shared with other tools
+limiter = RateLimiter(per_minute=int(os.getenv("osu_rate_limit", 600)),
+                      max_in_flight=int(os.getenv("osu_max_in_flight", 8)),
+                      burst=int(os.getenv("osu_rate_burst", 10)))
+
+#identical requests made at the same time share one network call
+flights = SingleFlight()
+
+#retry policy for transient failures, and a breaker to stop hammering the api while it's down
+retry_attempts = int(os.getenv("osu_retry_attempts", 4))
+retry_base_delay = float(os.getenv("osu_retry_base_delay", 0.5))
+retry_max_delay = float(os.getenv("osu_retry_max_delay", 8))
+breaker = CircuitBreaker(failure_threshold=int(os.getenv("osu_breaker_threshold", 5)),
+                         reset_timeout=int(os.getenv("osu_breaker_reset", 30)))
+endpoint_stats = EndpointStats()
+
 class Mods(IntFlag):
     """Enum of the osu! mods exposed by the API.
     
@@ -51,24 +91,156 @@ class Mods(IntFlag):
     MR = 1073741824
 
     def to_list(self):
-        """Returns a list of strings represented by this enumeration."""
-        mod_list = str(self).split("|")
-        mod_list[0] = mod_list[0].split("Mods.")[1]
-        return mod_list
+        """Returns a list of strings represented by this enumeration, highest value first ("NM" if empty)."""
+        #str() of a combination of flags changed in python 3.11, so the names are worked out directly
+        if not self:
+            return ["NM"]
+        return [mod.name for mod in _mods_descending if mod & self == mod]
+
+#every mod but NM, highest value first, for `Mods.to_list()`
+_mods_descending = [mod for mod in sorted(Mods, reverse=True) if mod]
+
+async def get_session():
+    """Get the process-wide `aiohttp.ClientSession`, creating it if needed.
+    
+    Every request to the osu! API (and its asset servers) should go through this session
+    so that connections are kept alive and reused instead of paying for a new TCP/TLS
+    handshake and DNS lookup on every call. The session is created lazily because aiohttp
+    wants to be inside a running event loop; `close_session()` should be called on shutdown."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(limit=conn_limit,
+                                         limit_per_host=conn_limit_per_host,
+                                         use_dns_cache=True,
+                                         ttl_dns_cache=dns_cache_ttl,
+                                         keepalive_timeout=keepalive_timeout)
+        _session = aiohttp.ClientSession(connector=connector,
+                                         timeout=aiohttp.ClientTimeout(total=request_timeout))
+    return _session
+
+async def close_session():
+    """Close the shared session if it is open. Safe to call more than once."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+class OsuApiError(Exception):
+    """Raised when the osu! API can't give us a usable response, even after retrying."""
+
+class EmptyResponseError(OsuApiError):
+    """Raised when an endpoint that should return results returns an empty list.
+
+    This is usually a user or beatmap that doesn't exist (a typo in a command, say), so it isn't
+    retried for `PRIORITY_USER` calls - the user would just wait longer for "not found". The v1
+    API occasionally does this for things that definitely exist, though, so `PRIORITY_BULK` calls
+    (where the data is known to be good) retry it like any other transient failure."""
+
+async def api_get(endpoint, params, *, priority=PRIORITY_USER, allow_empty=True, parse=None):
+    """Perform a GET against the osu! API and return the decoded JSON response.
+    
+    - `endpoint` is the v1 endpoint name, like `"get_user"`.
+    - `params` is a `dict` of query parameters. The api key is added automatically.
+    - `priority` should be `PRIORITY_USER` for anything a user is waiting on and
+    `PRIORITY_BULK` for ingestion work (rebuilds, `addmatch`, etc.), which yields to the former.
+    - If `allow_empty` is False, an empty response raises `EmptyResponseError` (retried only for
+    `PRIORITY_BULK`).
+    - `parse`, if given, is called on the decoded response and its result is returned instead
+    (see `apimodels`).
+
+    All requests go through the shared session and the shared rate `limiter`. Transient failures
+    (connection errors, timeouts, 5xx/429 responses) are retried with exponential backoff.
+    While the API is down, the circuit `breaker` makes calls fail fast with `CircuitOpenError`.
+    Everything else raises `OsuApiError`.
+
+    Concurrent calls with the same `endpoint` and `params` are coalesced into one request, and
+    every caller gets the same decoded object back - so don't mutate it."""
+    async def attempt():
+        trial = breaker.check()
+        try:
+            return await request()
+        finally:
+            if trial:
+                breaker.end_trial()
+
+    async def request():
+        async with limiter.limit(priority):
+            session = await get_session()
+            start = time.monotonic()
+            try:
+                async with session.get(f'{api_url}/{endpoint}', params={**params, 'k': api_key}) as resp:
+                    if resp.status >= 500 or resp.status == 429:
+                        raise RetryableError(f"{endpoint} returned HTTP {resp.status}")
+                    if resp.status >= 400:
+                        #bad key or bad request, retrying won't help
+                        breaker.record_success()
+                        raise OsuApiError(f"{endpoint} returned HTTP {resp.status}")
+                    data = apimodels.loads(await resp.read())
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                breaker.record_failure()
+                raise RetryableError(f"{endpoint} failed: {e!r}") from e
+            except RetryableError:
+                breaker.record_failure()
+                raise
+            finally:
+                endpoint_stats.record_latency(endpoint, time.monotonic()-start)
+        #the api answered, so it's up - even if the answer is empty
+        breaker.record_success()
+        if not data and not allow_empty:
+            raise EmptyResponseError(f"{endpoint} returned nothing for {params}")
+        #parsed here so that coalesced callers share the parsed result, too
+        return parse(data) if parse else data
 
-async def get_player_data(username):
-    "Return full JSON response from the osu! API with the given username."
+    retry_on = (RetryableError, EmptyResponseError) if priority == PRIORITY_BULK else (RetryableError,)
+
+    async def fetch():
+        try:
+            data = await retry(attempt, attempts=retry_attempts, base_delay=retry_base_delay,
+                               max_delay=retry_max_delay, retry_on=retry_on,
+                               on_retry=lambda e: endpoint_stats.record(endpoint, "retry"))
+        except RetryableError as e:
+            endpoint_stats.record(endpoint, "failure")
+            #out of retries, so callers only ever have to handle OsuApiError
+            raise OsuApiError(str(e)) from e
+        except (OsuApiError, CircuitOpenError):
+            endpoint_stats.record(endpoint, "failure")
+            raise
+        endpoint_stats.record(endpoint, "success")
+        return data
+
+    #priority is part of the key since it decides whether empty responses are retried
+    key = (endpoint, tuple(sorted(params.items())), allow_empty, parse, priority)
+    return await flights.run(key, fetch)
+
+def get_api_stats():
+    """Returns a `dict` of counters useful for tuning the osu! API client."""
+    return {
+        "limiter": limiter.get_stats(),
+        "beatmap_cache": beatmap_cache.get_stats(),
+        "singleflight": flights.get_stats(),
+        "breaker": breaker.get_stats(),
+        "endpoints": endpoint_stats.get_stats()
+    }
+
+async def get_player_data(username, *, priority=PRIORITY_USER):
+    "Return the `apimodels.User` with the given username."
     #inherently works with either ID or username, ID preferred
-    async with aiohttp.ClientSession() as session:
-        player_request = await session.get(f'https://osu.ppy.sh/api/get_user?k={api_key}&u={username}')
-        player_data = await player_request.json()
+    player_data = await api_get('get_user', {'u': username}, priority=priority, allow_empty=False,
+                                parse=apimodels.parse_users)
     #print(player_data)
     return player_data[0]
 
-async def get_map_data(diff_id):
-    async with aiohttp.ClientSession() as session:
-        map_request = await session.get(f'https://osu.ppy.sh/api/get_beatmaps?k={api_key}&b={diff_id}')
-        map_data = await map_request.json()
+async def get_map_data(diff_id, *, priority=PRIORITY_USER, use_cache=True):
+    """Return the `apimodels.Beatmap` of `diff_id`.
+    
+    Reads through `beatmap_cache` unless `use_cache` is False, in which case the API is
+    always hit (and the cache is refreshed with the result)."""
+    if use_cache:
+        cached = await beatmap_cache.get(diff_id)
+        if cached is not None:
+            return cached
+    map_data = await api_get('get_beatmaps', {'b': diff_id}, priority=priority, allow_empty=False,
+                             parse=apimodels.parse_beatmaps)
     '''
     thumbnail_url = f'https://b.ppy.sh/thumb/{map_data[0]["beatmapset_id"]}l.jpg'
     map_name = f'{map_data[0]["artist"]} - {map_data[0]["title"]}'
@@ -79,34 +251,215 @@ async def get_map_data(diff_id):
     }
     return data
     '''
+    await beatmap_cache.put(diff_id, map_data[0])
     return map_data[0]
 
-async def get_match_data(match_id):
-    async with aiohttp.ClientSession() as session:
-        match_request = await session.get(f'https://osu.ppy.sh/api/get_match?k={api_key}&mp={match_id}')
-        match_data = await match_request.json()
+async def get_match_data(match_id, *, priority=PRIORITY_USER):
+    "Return the `apimodels.Match` with the given match id."
+    match_data = await api_get('get_match', {'mp': match_id}, priority=priority, parse=apimodels.parse_match)
     return match_data
 
-async def process_match_data(match_id, map, *, data=None, player_ids={}, ignore_threshold=1000, ignore_player_ids=[]):
-    #no head-to-head functionality yet
-    """Returns a dict of match data tailored for stat calculation.
+async def resolve_players(user_ids, player_ids, *, priority=PRIORITY_USER):
+    """Make sure `player_ids` has an entry for every id in `user_ids`, then return it.
+
+    `player_ids` is a dict of player ids (str) to [`player_name` (str), `team_name` (str)]; it
+    is updated in place. Ids that aren't already in it are looked up in the player directory (and
+    then MongoDB, in a single query; see `db_get.get_player_entries()`), then whatever is still missing (probably non-tournament players) is looked up on the
+    osu! API concurrently. Players that can't be found anywhere (restricted, maybe) get their id
+    as their name and no team."""
+    missing = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in player_ids]
+    if not missing:
+        return player_ids
+    for user_id, entry in zip(missing, await db_get.get_player_entries(missing)):
+        if entry is not None:
+            player_ids[user_id] = [entry.user_name, entry.team_name]
+
+    missing = [user_id for user_id in missing if user_id not in player_ids]
+    if missing:
+        #this means that we don't have these players saved for some reason
+        #this'll probably happen if somebody tries to get a non-tournament mp
+        print(f"MongoDB lookup for {missing} failed, resorting to osu! api")
+        results = await asyncio.gather(*[get_player_data(user_id, priority=priority) for user_id in missing],
+                                       return_exceptions=True)
+        for user_id, player_data in zip(missing, results):
+            if isinstance(player_data, Exception):
+                print(f"osu! api lookup for {user_id} failed: {player_data}")
+                player_ids[user_id] = [user_id, ""]
+            else:
+                player_ids[user_id] = [player_data.username, ""]
+    return player_ids
+
+#numeric fields of an `apimodels.Score`; these are also the fields right after `user_id`, in the same order,
+#so that they can be sliced out of each score
+score_fields = ("team", "score", "maxcombo", "count300", "count100", "count50", "countmiss")
+assert apimodels.Score._fields[1:1+len(score_fields)] == score_fields
+
+def score_columns(games):
+    """Load every score in `games` (a list of `apimodels.Game`) into numpy columns.
     
-    `data` is expected to be the data of a `get_match_data()` call, and is used in lieu of calling
-    the osu! API - helpful if successive calls of this function for the same match occur.
-    Otherwise, `match_id` is used to get match data, then the nth `map` (zero-indexed) is 
-    obtained and processed. If available, `player_ids` should be provided, a dict of `player_ids`
-    (str) to [`player_names` (str), `team_name` (str)].
+    Returns a dict of equal-length arrays, one row per score, in the order the scores appear:
+    - `game`: the position of the score's game in `games`
+    - one `int64` array for each of `score_fields`
+    - `user_id`: the user ids, as a list of `str`"""
+    scores = [player_score for game_data in games for player_score in game_data.scores]
+    #scores are already parsed, so this is just copying ints into one block
+    table = np.fromiter(itertools.chain.from_iterable([player_score[1:1+len(score_fields)] for player_score in scores]),
+                        dtype=np.int64, count=len(scores)*len(score_fields)).reshape(-1, len(score_fields))
+    columns = {"game": np.repeat(np.arange(len(games)), [len(game_data.scores) for game_data in games])}
+    for column, field in enumerate(score_fields):
+        columns[field] = table[:, column]
+    columns["user_id"] = [player_score.user_id for player_score in scores]
+    return columns
 
-    Map indexes are redirected like other paginated functions; indexes less than 0 become 0, and 
-    indexes greater than the max index become the max index.
+def process_games(match_id, match_data, games, map_data, player_ids, *, ignore_threshold=1000, ignore_player_ids=[]):
+    """Crunch the numbers for several games (maps) of a match at once.
+    
+    This does no I/O: `games` is a list of `apimodels.Game`, `map_data` is a dict of diff ids
+    to their `get_map_data()` result (`apimodels.Beatmap`), and `player_ids` must already contain every player in `games`
+    (see `resolve_players()`). The scores of every game are loaded into numpy columns, and team totals,
+    accuracy, contribution, winners and score differences are calculated for all of them together;
+    they're only turned back into dicts at the end.
+    
+    Returns a list the same length as `games`, where games that can't be processed (no scores,
+    or not a team mode) are `None`. See `process_full_match()` for the format of each dict."""
+    results = [None]*len(games)
+    #head-to-head and tag co-op are currently unsupported!
+    team_games = [game_pos for game_pos, game_data in enumerate(games)
+                  if game_data.scores and game_data.team_type in ('2', '3')]
+    if not team_games:
+        return results
+    game_count = len(games)
+    col = score_columns([games[game_pos] for game_pos in team_games])
+    #map positions in team_games back to positions in games
+    game = np.array(team_games, dtype=np.int64)[col["game"]]
+    score = col["score"]
+
+    #ignore if below minimum score threshold or in ignore list
+    counted = score >= ignore_threshold
+    if ignore_player_ids:
+        counted &= ~np.isin(np.array(col["user_id"]), list(ignore_player_ids))
+    team_1 = counted & (col["team"] == 1)
+    team_2 = counted & (col["team"] == 2)
+
+    #per-game team totals and player counts
+    team_1_score = np.zeros(game_count, dtype=np.int64)
+    team_2_score = np.zeros(game_count, dtype=np.int64)
+    np.add.at(team_1_score, game[team_1], score[team_1])
+    np.add.at(team_2_score, game[team_2], score[team_2])
+    team_1_count = np.bincount(game[team_1], minlength=game_count)
+    team_2_count = np.bincount(game[team_2], minlength=game_count)
+    score_diff = np.abs(team_1_score-team_2_score)
+
+    #per-score accuracy and contribution; rows that aren't counted may divide by zero,
+    #but they're thrown away anyways
+    with np.errstate(divide='ignore', invalid='ignore'):
+        acc_count = col["count300"] + col["count100"] + col["count50"] + col["countmiss"]
+        accuracy = (col["count300"]+(col["count100"]/3)+(col["count50"]/6))/acc_count
+        team_total = np.where(col["team"] == 1, team_1_score[game], team_2_score[game])
+        contrib = score/team_total
+
+    #back to python types, since bson can't encode numpy ints
+    row_game = game.tolist()
+    row_counted = counted.tolist()
+    score = score.tolist()
+    accuracy = accuracy.tolist()
+    contrib = contrib.tolist()
+    combo = col["maxcombo"].tolist()
+    count_300 = col["count300"].tolist()
+    count_100 = col["count100"].tolist()
+    count_50 = col["count50"].tolist()
+    count_miss = col["countmiss"].tolist()
+    team_1_score = team_1_score.tolist()
+    team_2_score = team_2_score.tolist()
+    team_1_count = team_1_count.tolist()
+    team_2_count = team_2_count.tolist()
+    score_diff = score_diff.tolist()
+
+    #global mods assumed, so they only need to be worked out once per game
+    mod_vals = {game_pos: games[game_pos].mods for game_pos in team_games}
+    mod_lists = {game_pos: Mods(mod_val).to_list() for game_pos, mod_val in mod_vals.items()}
 
-    - `ignore_player_list` will ignore specific player ids from calculation. 
+    individual_scores = collections.defaultdict(list)
+    game_scores = [player_score for game_pos in team_games for player_score in games[game_pos].scores]
+    for row, player_score in enumerate(game_scores):
+        if not row_counted[row]:
+            continue
+        game_pos = row_game[row]
+        player_name, team_name = player_ids[player_score.user_id]
+        individual_scores[game_pos].append({
+            "user_id": player_score.user_id,
+            "user_name": player_name,
+            "score": score[row],
+            "combo": combo[row],
+            "accuracy": accuracy[row],
+            "mod_val": mod_vals[game_pos],
+            "mods": list(mod_lists[game_pos]),
+            "pass": "1" if player_score.passed else "0",
+            "hits": {
+                "300_count": count_300[row],
+                "100_count": count_100[row],
+                "50_count": count_50[row],
+                "miss_count": count_miss[row]
+            },
+            "team_contrib": contrib[row],
+            "team": str(player_score.team),
+            "team_name": team_name
+        })
+
+    for game_pos in team_games:
+        game_data = games[game_pos]
+        game_map_data = map_data[game_data.beatmap_id]
+        #who won
+        if team_1_score[game_pos] != team_2_score[game_pos]:
+            winner = "Blue" if team_1_score[game_pos] > team_2_score[game_pos] else "Red"
+        else:
+            winner = "Tie"
+        results[game_pos] = {
+            "match_name": match_data.name,
+            "match_id": match_id,
+            "match_url": f'https://osu.ppy.sh/community/matches/{match_id}',
+            "diff_id": game_data.beatmap_id,
+            "diff_url": f'https://osu.ppy.sh/b/{game_data.beatmap_id}',
+            "map_thumbnail": f'https://b.ppy.sh/thumb/{game_map_data.beatmapset_id}l.jpg',
+            "map_name": f'{game_map_data.artist} - {game_map_data.title} [{game_map_data.version}]',
+            "winner": winner,
+            "score_difference": score_diff[game_pos],
+            "team_1_score": team_1_score[game_pos],
+            "team_2_score": team_2_score[game_pos], 
+            "team_1_score_avg": round(team_1_score[game_pos]/team_1_count[game_pos],2) if team_1_count[game_pos] != 0 else 0,
+            "team_2_score_avg": round(team_2_score[game_pos]/team_2_count[game_pos],2) if team_2_count[game_pos] != 0 else 0,
+            "individual_scores": individual_scores[game_pos],
+            "start_time": game_data.start_time,
+            "scoring_type": game_data.scoring_type,
+            "team_type": game_data.team_type,
+            "play_mode": game_data.play_mode,
+            "player_ids": player_ids
+        }
+    return results
+
+async def process_full_match(match_id, *, data=None, indexes=None, player_ids=None, ignore_threshold=1000,
+                             ignore_player_ids=[], priority=PRIORITY_USER):
+    #no head-to-head functionality yet
+    """Returns a list of dicts of match data tailored for stat calculation, one per game.
+    
+    `data` is expected to be the `apimodels.Match` of a `get_match_data()` call, and is used in lieu of calling
+    the osu! API. Otherwise, `match_id` is used to get match data. The response is only parsed once:
+    every beatmap in the match is resolved concurrently (through the beatmap cache), and every
+    player is resolved with one batched lookup (see `resolve_players()`), so processing a whole
+    match costs a fixed number of round trips no matter how many games were played.
+
+    - `indexes` is a list of game indexes (zero-indexed) to process. All games by default.
+    - `player_ids` is a dict of `player_ids` (str) to [`player_names` (str), `team_name` (str)],
+    used as a cache across calls if provided. It's updated in place.
+    - `ignore_player_ids` will ignore specific player ids from calculation. 
     - `ignore_threshold` will ignore scores below a specific value. 1000 by default.
+    - `priority` is passed to any osu! API calls made; see `api_get()`.
 
-    This function aims to expose useful data not normally available from the get_match
-    endpoint of the API.
+    Games that can't be processed (no scores, or not a team mode) are left out. This function
+    aims to expose useful data not normally available from the get_match endpoint of the API.
 
-    Returns the following dict:
+    Each dict in the returned list is in the following format, with the extra key `match_index`
+    (`int`, the index of the game in the match):
     ```
     {
         "match_name": str,
@@ -152,136 +505,56 @@ async def process_match_data(match_id, map, *, data=None, player_ids={}, ignore_
     ```
     """
     match_data = data
-
     if not match_data:
-        match_data = await get_match_data(match_id)
+        match_data = await get_match_data(match_id, priority=priority)
+    if player_ids is None:
+        player_ids = {}
 
-    max_index = len(match_data["games"])-1
-    if map < 0:
-        map = 1
-    if map > max_index:
-        map = max_index
+    games = match_data.games
+    if indexes is None:
+        indexes = range(len(games))
+    #only team vs games with scores are processed, so don't bother fetching anything for the others
+    indexes = [index for index in indexes if games[index].scores and games[index].team_type in ('2', '3')]
+
+    #every unique beatmap at once - duplicates (rematches, tiebreakers) only cost one lookup
+    diff_ids = list(dict.fromkeys(games[index].beatmap_id for index in indexes))
+    map_results = await asyncio.gather(*[get_map_data(diff_id, priority=priority) for diff_id in diff_ids])
+    map_data = dict(zip(diff_ids, map_results))
+
+    await resolve_players([player_score.user_id for index in indexes for player_score in games[index].scores],
+                          player_ids, priority=priority)
 
-    game_data = match_data["games"][int(map)]
+    processed_games = []
+    results = process_games(match_id, match_data, [games[index] for index in indexes], map_data, player_ids,
+                            ignore_threshold=ignore_threshold, ignore_player_ids=ignore_player_ids)
+    for index, processed in zip(indexes, results):
+        if processed is None:
+            continue
+        processed["match_index"] = index
+        processed_games.append(processed)
+    return processed_games
 
-    #stop execution here if no scores are available, but there was a game for some reason
-    if not game_data['scores']:
-        return None
-    map_data = await get_map_data(game_data["beatmap_id"])
-    #now we'll start number crunching and stuff
+async def process_match_data(match_id, map, *, data=None, player_ids={}, ignore_threshold=1000, ignore_player_ids=[],
+                             priority=PRIORITY_USER):
+    """Returns a dict of match data tailored for stat calculation, for a single game.
     
-    #if head-to-head or tag co-op is selected
-    if game_data['team_type'] in ('0', '1'):
-        #currently unsupported!
-        return None
-
-    #if a team mode is selected
-    if game_data['team_type'] in ('2', '3'):
-        #determine who belongs in what team as well as the team scores
-        #as of now this is only used to get the number of players on a team, since we use
-        #a conditional to add teams to the correct field anyways
-        team_1_players = []
-        team_2_players = []
-        team_1_score = 0
-        team_2_score = 0
-        for player_score in game_data['scores']:
-            #ignore if below minimum score threshold or in ignore list
-            if int(player_score["score"]) < ignore_threshold or player_score["user_id"] in ignore_player_ids:
-                continue
-            if player_score["team"] == "1":
-                team_1_players.append(player_score["user_id"])
-                team_1_score += int(player_score["score"])
-            if player_score["team"] == "2":
-                team_2_players.append(player_score["user_id"])
-                team_2_score += int(player_score["score"])
+    This is `process_full_match()` for the nth `map` (zero-indexed) of the match only; the
+    returned dict is in the same format. Returns `None` if that game can't be processed.
 
-        #who won
-        if team_1_score != team_2_score:
-            winner = "Blue" if team_1_score > team_2_score else "Red"
-        else:
-            winner = "Tie"
+    Map indexes are redirected like other paginated functions; indexes less than 0 become 0, and 
+    indexes greater than the max index become the max index."""
+    match_data = data
 
-        #score diff
-        score_diff = abs(team_1_score-team_2_score)
-
-        #generate the data for individual player scores for this map
-        individual_scores = []
-        for player_score in game_data["scores"]:
-            #ignore if below minimum score threshold or in ignore list
-            if int(player_score["score"]) < ignore_threshold or player_score["user_id"] in ignore_player_ids:
-                continue
-            count_300 = int(player_score["count300"])
-            count_100 = int(player_score["count100"])
-            count_50 = int(player_score["count50"])
-            count_miss = int(player_score["countmiss"])
-            acc_count = count_300 + count_100 + count_50 + count_miss
-            acc_value = (count_300+(count_100/3)+(count_50/6))/acc_count
-            score = int(player_score["score"])
-            contrib = score/team_1_score if player_score["team"] == "1" else score/team_2_score
-            
-            #if we don't currently know what the name of a certain player id is, look it up against the mongodb and osuapi, in that order
-            #might fail if the player is restricted, not sure on that
-            try:
-                player_name = player_ids[player_score["user_id"]][0]
-                team_name = player_ids[player_score["user_id"]][1]
-            except:
-                #print(f"Hit MongoDB for player ID {player_score['user_id']}")
-                player_document = await db_get.get_player_document(player_score['user_id'])
-                if player_document == None:
-                    #this means that we don't have this player saved for some reason
-                    #so we'll go the alternative route, getting the username manually
-                    #this'll probably happen if somebody tries to get a non-tournament mp
-                    print(f"MongoDB lookup for {player_score['user_id']} failed, resorting to osu! api")
-                    player_data = await get_player_data(player_score["user_id"])
-                    player_name = player_data["username"]
-                    team_name = ""
-                else:
-                    player_name = player_document["user_name"]
-                    team_name = player_document["team_name"]
-                #add to player_ids dict, which will help us build a cache over time for certain processes
-                player_ids[player_score["user_id"]] = [player_name, team_name]
-            individual_score = {
-                "user_id": player_score["user_id"],
-                "user_name": player_name,
-                "score": score,
-                "combo": int(player_score["maxcombo"]),
-                "accuracy": acc_value,
-                "mod_val": int(game_data["mods"]),
-                "mods": Mods(int(game_data["mods"])).to_list(), #global mods assumed
-                "pass": player_score["pass"],
-                "hits": {
-                    "300_count": count_300,
-                    "100_count": count_100,
-                    "50_count": count_50,
-                    "miss_count": count_miss
-                },
-                "team_contrib": contrib,
-                "team": player_score["team"],
-                "team_name": team_name
-            }
-            individual_scores.append(individual_score)
-        #import pprint
-        #pprint.pprint(match_data)
-        #pprint.pprint(game_data)
-        team_vs_final = {
-            "match_name": match_data["match"]["name"],
-            "match_id": match_id,
-            "match_url": f'https://osu.ppy.sh/community/matches/{match_id}',
-            "diff_id": game_data["beatmap_id"],
-            "diff_url": f'https://osu.ppy.sh/b/{game_data["beatmap_id"]}',
-            "map_thumbnail": f'https://b.ppy.sh/thumb/{map_data["beatmapset_id"]}l.jpg',
-            "map_name": f'{map_data["artist"]} - {map_data["title"]} [{map_data["version"]}]',
-            "winner": winner,
-            "score_difference": score_diff,
-            "team_1_score": team_1_score,
-            "team_2_score": team_2_score, 
-            "team_1_score_avg": round(team_1_score/len(team_1_players),2) if len(team_1_players) != 0 else 0,
-            "team_2_score_avg": round(team_2_score/len(team_2_players),2) if len(team_2_players) != 0 else 0,
-            "individual_scores": individual_scores,
-            "start_time": game_data["start_time"],
-            "scoring_type": game_data["scoring_type"],
-            "team_type": game_data["team_type"],
-            "play_mode": game_data["play_mode"],
-            "player_ids": player_ids
-        }
-        return team_vs_final
\ No newline at end of file
+    if not match_data:
+        match_data = await get_match_data(match_id, priority=priority)
+
+    max_index = len(match_data.games)-1
+    if map < 0:
+        map = 0
+    if map > max_index:
+        map = max_index
+
+    processed_games = await process_full_match(match_id, data=match_data, indexes=[int(map)], player_ids=player_ids,
+                                               ignore_threshold=ignore_threshold, ignore_player_ids=ignore_player_ids,
+                                               priority=priority)
+    return processed_games[0] if processed_games else None
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""Token-bucket rate limiting for outgoing osu! API requests.
+
+The osu! API v1 limits keys to a certain number of requests per minute. Every call in
+`osuapi` acquires a slot from a shared `RateLimiter` so that bulk ingestion (rebuilds,
+`addmatch`) and user-facing commands can run at the same time without going over it.
+"""
+import asyncio
+import contextlib
+import heapq
+import itertools
+import time
+
+#lower values are served first
+PRIORITY_USER = 0
+PRIORITY_BULK = 1
+
+class RateLimiter:
+    """Token bucket with a cap on the number of requests in flight.
+
+    - `per_minute` is the sustained number of requests allowed per minute.
+    - `max_in_flight` is the number of requests allowed to be running at once.
+    - `burst` is the bucket size, i.e. how many requests can go out back-to-back
+    after the limiter has been idle.
+
+    Waiters are served by priority first (see `PRIORITY_USER` and `PRIORITY_BULK`),
+    then in the order they arrived."""
+    def __init__(self, per_minute, max_in_flight, burst=10):
+        self.rate = per_minute/60
+        self.max_in_flight = max_in_flight
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.in_flight = 0
+
+        #heap of (priority, arrival order, future)
+        self._waiters = []
+        self._order = itertools.count()
+        self._wakeup = None
+
+        self.stats = {
+            "acquired": 0,
+            "waited": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+            "max_queue_depth": 0,
+            "by_priority": {
+                PRIORITY_USER: {"acquired": 0, "total_wait": 0.0},
+                PRIORITY_BULK: {"acquired": 0, "total_wait": 0.0},
+            }
+        }
+
+    @property
+    def queue_depth(self):
+        """The number of requests currently waiting for a slot."""
+        return len([waiter for waiter in self._waiters if not waiter[2].done()])
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now-self.updated)*self.rate)
+        self.updated = now
+
+    def _can_start(self):
+        return self.in_flight < self.max_in_flight and self.tokens >= 1
+
+    def _dispatch(self):
+        """Hand out slots to waiters in priority order, scheduling a wakeup if out of tokens."""
+        self._refill()
+        while self._waiters and self._can_start():
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                #cancelled while waiting
+                continue
+            self.tokens -= 1
+            self.in_flight += 1
+            future.set_result(None)
+        #if we're only waiting on tokens (not on in-flight requests) nothing else will
+        #call _dispatch(), so wake up once the next token is available
+        if self._waiters and self.in_flight < self.max_in_flight and self._wakeup is None:
+            delay = (1-self.tokens)/self.rate
+            self._wakeup = asyncio.get_event_loop().call_later(delay, self._on_wakeup)
+
+    def _on_wakeup(self):
+        self._wakeup = None
+        self._dispatch()
+
+    async def acquire(self, priority=PRIORITY_BULK):
+        """Wait for a request slot. Every `acquire()` must be paired with a `release()`."""
+        start = time.monotonic()
+        self._refill()
+        if not self.queue_depth and self._can_start():
+            self.tokens -= 1
+            self.in_flight += 1
+        else:
+            future = asyncio.get_event_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._order), future))
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self.queue_depth)
+            self._dispatch()
+            try:
+                await future
+            except asyncio.CancelledError:
+                #we may have been given a slot right before being cancelled
+                if not future.cancelled():
+                    self.release()
+                raise
+            self.stats["waited"] += 1
+
+        wait = time.monotonic()-start
+        self.stats["acquired"] += 1
+        self.stats["total_wait"] += wait
+        self.stats["max_wait"] = max(self.stats["max_wait"], wait)
+        self.stats["by_priority"][priority]["acquired"] += 1
+        self.stats["by_priority"][priority]["total_wait"] += wait
+
+    def release(self):
+        """Give back a request slot."""
+        self.in_flight -= 1
+        self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def limit(self, priority=PRIORITY_BULK):
+        """`async with limiter.limit(priority):` - acquires and releases a slot."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def get_stats(self):
+        """Returns a copy of the counters along with the current queue depth and in-flight count."""
+        stats = dict(self.stats)
+        stats["by_priority"] = {priority: dict(counts) for priority, counts in self.stats["by_priority"].items()}
+        stats["queue_depth"] = self.queue_depth
+        stats["in_flight"] = self.in_flight
+        stats["average_wait"] = self.stats["total_wait"]/self.stats["acquired"] if self.stats["acquired"] else 0.0
+        return stats
@@ -0,0 +1,124 @@
+"""Retries, circuit breaking and failure accounting for outgoing requests.
+
+A long `rebuild_all` makes hundreds of osu! API calls, and one transient 5xx used to kill
+the entire run. `retry()` retries a failed call with exponential backoff (plus jitter, so
+concurrent retries don't all land at once), and `CircuitBreaker` makes calls fail fast while
+the API is clearly down instead of piling up more retries.
+"""
+import asyncio
+import random
+import time
+import collections
+
+class RetryableError(Exception):
+    """Raised for failures worth trying again, like 5xx responses."""
+
+class CircuitOpenError(Exception):
+    """Raised instead of making a request while the circuit breaker is open."""
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    - `failure_threshold` consecutive failures open the circuit.
+    - While open, `check()` raises `CircuitOpenError` until `reset_timeout` seconds pass.
+    - After that, the circuit is half-open: one trial request is let through. If it succeeds
+    the circuit closes, otherwise it opens again for another `reset_timeout`."""
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self.stats = {
+            "opened": 0,
+            "rejected": 0,
+        }
+
+    def check(self):
+        """Raise `CircuitOpenError` if a request shouldn't be made right now.
+
+        Returns True if the caller is making the half-open trial request, in which case
+        `end_trial()` must be called once it's done (whatever the outcome)."""
+        if self.state == "open":
+            if time.monotonic()-self.opened_at < self.reset_timeout:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(f"osu! API circuit is open (retrying in "
+                                       f"{self.reset_timeout-(time.monotonic()-self.opened_at):.0f}s)")
+            self.state = "half-open"
+        if self.state == "half-open":
+            if self._trial_running:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError("osu! API circuit is half-open and a trial request is running")
+            self._trial_running = True
+            return True
+        return False
+
+    def end_trial(self):
+        self._trial_running = False
+
+    def record_success(self):
+        self.failures = 0
+        self.state = "closed"
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_running = False
+        if self.state == "half-open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.stats["opened"] += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def get_stats(self):
+        return {**self.stats, "state": self.state, "consecutive_failures": self.failures}
+
+class EndpointStats:
+    """Per-endpoint success/retry/failure counters and request latency."""
+    def __init__(self):
+        self.counters = collections.defaultdict(lambda: {
+            "success": 0,
+            "retry": 0,
+            "failure": 0,
+            "requests": 0,
+            "total_latency": 0.0,
+            "max_latency": 0.0,
+        })
+
+    def record_latency(self, endpoint, latency):
+        counter = self.counters[endpoint]
+        counter["requests"] += 1
+        counter["total_latency"] += latency
+        counter["max_latency"] = max(counter["max_latency"], latency)
+
+    def record(self, endpoint, outcome):
+        """`outcome` is one of `"success"`, `"retry"`, or `"failure"`."""
+        self.counters[endpoint][outcome] += 1
+
+    def get_stats(self):
+        stats = {}
+        for endpoint, counter in self.counters.items():
+            stats[endpoint] = dict(counter)
+            stats[endpoint]["average_latency"] = (counter["total_latency"]/counter["requests"]
+                                                  if counter["requests"] else 0.0)
+        return stats
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """The "full jitter" delay before retry number `attempt` (starting at 0)."""
+    return random.uniform(0, min(max_delay, base_delay*(2**attempt)))
+
+async def retry(func, *, attempts=4, base_delay=0.5, max_delay=8.0, retry_on=(RetryableError,), on_retry=None):
+    """Await `func()` (a coroutine function), retrying up to `attempts` times in total.
+
+    Only exceptions in `retry_on` are retried; anything else (including `CircuitOpenError`)
+    is raised immediately. `on_retry(exception)` is called before each retry, if given."""
+    for attempt in range(attempts):
+        try:
+            return await func()
+        except retry_on as e:
+            if attempt == attempts-1:
+                raise
+            if on_retry:
+                on_retry(e)
+            await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay))
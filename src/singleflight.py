@@ -0,0 +1,47 @@
+"""Coalescing of identical concurrent requests.
+
+If several commands ask for the same thing at the same time (say, three people running
+`getmatch` on a match that just ended), only the first one actually does the work. Everyone
+else waits on the first one's result instead of making their own request.
+"""
+import asyncio
+
+class SingleFlight:
+    """Group of in-flight calls, keyed by whatever identifies a request (endpoint and parameters)."""
+    def __init__(self):
+        self._calls = {}
+        self.stats = {
+            "calls": 0,
+            "coalesced": 0,
+        }
+
+    async def run(self, key, func):
+        """Run `func()` (a coroutine function) unless a call with the same `key` is in flight.
+
+        Callers sharing a call get the same result object, or the same exception. The shared
+        call is shielded, so one caller being cancelled doesn't cancel it for everyone else."""
+        self.stats["calls"] += 1
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        #only remove our own entry - a newer call may have already replaced it
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        #retrieve the exception so asyncio doesn't complain about it never being retrieved
+        #if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    @property
+    def in_flight(self):
+        return len(self._calls)
+
+    def get_stats(self):
+        return {**self.stats, "in_flight": self.in_flight}
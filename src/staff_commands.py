@@ -40,17 +40,20 @@ class StaffCommands(commands.Cog):
 
         This includes calls to update player and mappool data, as well as confirmation.
         """
-        if await db_get.get_match_document(match_id):
+        status = await db_manip.get_ingest_status(match_id)
+        if status == "done":
             await prompts.error_embed(self.bot, ctx, "That match seems to have already been added!")
             return None
+        if status == "partial":
+            await ctx.send("That match was only partially added last time - this will finish adding it.")
 
         ref_data = None
         ref_name = None
         ref_id = None
         if referee_id is not None:
             ref_data = await osuapi.get_player_data(referee_id)
-            ref_name = ref_data["username"]
-            ref_id = ref_data["user_id"]
+            ref_name = ref_data.username
+            ref_id = ref_data.user_id
 
         prompt = (f"Are these correct?\n\n"
                   f"**Match ID:** {match_id}\n"
@@ -130,15 +133,24 @@ class AdminDatabaseCommands(commands.Cog):
         await ctx.send("done")
 
     @commands.command(hidden=True)
-    async def rebuildall(self, ctx, sheet_id=None):
+    async def apistats(self, ctx):
+        """Send the osu! API client's counters (rate limiter, etc.) and the meta cache's, pretty-printed."""
+        stats = pprint.pformat({**osuapi.get_api_stats(), "meta_cache": db_get.get_meta_cache_stats()}, indent=4)
+        await ctx.send(f"```\n{stats}\n```")
+
+    @commands.command(hidden=True)
+    async def rebuildall(self, ctx, sheet_id=None, resume=None):
         """Rebuild the *entire* cluster from scratch from the specified gsheet id.
         
         Does not include the DiscordUser database. Use individual deletion if you 
-        find the need to delete a DiscordUser document, or wipe the whole thing."""
+        find the need to delete a DiscordUser document, or wipe the whole thing.
+        
+        `rebuildall <sheet_id> resume` continues an interrupted rebuild instead."""
         if sheet_id is not None:
-            if await prompts.confirmation_dialog(self.bot, ctx, "Rebuild all?"):
+            resume = resume == "resume"
+            if await prompts.confirmation_dialog(self.bot, ctx, "Resume rebuild?" if resume else "Rebuild all?"):
                 await ctx.send("ok, processing")
-                await db_manip.rebuild_all(self.bot, ctx, sheet_id)
+                await db_manip.rebuild_all(self.bot, ctx, sheet_id, resume=resume)
         else:
             msg = ("hardcoded IDs:\n"
                    "STK7 data (full): 1OfLrz4o-Qt5k_JvpVl8CSiZsRt-veiFlFkuG8G0BnzU\n"
@@ -160,7 +160,7 @@ class UserStatsCommands(commands.Cog):
         themselves with a username/user id."""
         player_name = " ".join(player)
         if player_name:
-            player_doc = await db_get.get_player_document(player_name)
+            player_doc = await db_get.get_player_document(player_name, profile="card")
             if not player_doc:
                 error = ("Couldn't find that tournament player. Try enclosing your name in quotes "
                          "`(\"\")` or using your actual osu! user ID. Note that non-tournament players "
@@ -174,7 +174,7 @@ class UserStatsCommands(commands.Cog):
                 await prompts.error_embed(self, ctx, "I need a player name (or set your name with `setuser`)!")
                 return None
             else:
-                player_doc = await db_get.get_player_document(player_name)
+                player_doc = await db_get.get_player_document(player_name, profile="card")
         await ctx.trigger_typing()
         image_object = await image_manip.make_player_card(player_doc)
         await ctx.send(file=discord.File(fp=image_object, filename=f'player_card_{player_name}.png'))
@@ -188,7 +188,7 @@ class UserStatsCommands(commands.Cog):
         themselves with a username/user id."""
         player_name = " ".join(player)
         if player_name:
-            player_doc = await db_get.get_player_document(player_name)
+            player_doc = await db_get.get_player_document(player_name, profile="embed")
             if not player_doc:
                 error = ("Couldn't find that tournament player. Try enclosing your name in quotes "
                          "`(\"\")` or using your actual osu! user ID. Note that non-tournament players "
@@ -202,7 +202,7 @@ class UserStatsCommands(commands.Cog):
                 await prompts.error_embed(self, ctx, "I need a player name (or set your name with `setuser`)!")
                 return None
             else:
-                player_doc = await db_get.get_player_document(player_name)
+                player_doc = await db_get.get_player_document(player_name, profile="embed")
         player_url = f'https://osu.ppy.sh/u/{player_doc["_id"]}'
         stat = player_doc["cached"]
 
@@ -264,7 +264,7 @@ class UserStatsCommands(commands.Cog):
         apply if `user`, `page`, or `mod` wasn't changed by this check."""
         player_name, page, mod = argparser(params)
         if player_name:
-            score_docs, page, max_page = await db_get.get_top_player_scores(player_name, page, mod)
+            score_docs, page, max_page = await db_get.get_top_player_scores(player_name, page, mod, profile="row")
             if score_docs is None and max_page is None:
                 error = ("Couldn't find that tournament player. Try enclosing your name in quotes "
                          "`(\"\")` or using your actual osu! user ID. Note that non-tournament players "
@@ -281,7 +281,7 @@ class UserStatsCommands(commands.Cog):
                 await prompts.error_embed(self, ctx, "I need a player name (or set your name with `setuser`)!")
                 return None
             else:
-                score_docs, page, max_page = await db_get.get_top_player_scores(player_name, page, mod)
+                score_docs, page, max_page = await db_get.get_top_player_scores(player_name, page, mod, profile="row")
                 if max_page == 0:
                     await prompts.error_embed(self, ctx, "You don't seem to have scores yet.")
                     return None
@@ -298,7 +298,7 @@ class UserStatsCommands(commands.Cog):
         themselves with a username/user id."""
         team_name = " ".join(team)
         if team_name:
-            team_doc = await db_get.get_team_document(team_name)
+            team_doc = await db_get.get_team_document(team_name, profile="card")
             if not team_doc:
                 await prompts.error_embed(self, ctx, "Couldn't find that team... (Try using quotes?)")
                 return None
@@ -308,7 +308,7 @@ class UserStatsCommands(commands.Cog):
                 await prompts.error_embed(self, ctx, "I need a team name (or set your team with `setuser`)!")
                 return None
             else:
-                team_doc = await db_get.get_team_document(team_name)
+                team_doc = await db_get.get_team_document(team_name, profile="card")
         await ctx.trigger_typing()
         image_object = await image_manip.make_team_card(team_doc)
         await ctx.send(file=discord.File(fp=image_object, filename=f'team_card_{team_name}.png'))
@@ -322,7 +322,7 @@ class UserStatsCommands(commands.Cog):
         themselves with a username/user id, which implicitly associates them with a team."""
         team_name = " ".join(team)
         if team_name:
-            team_doc = await db_get.get_team_document(team_name)
+            team_doc = await db_get.get_team_document(team_name, profile="embed")
             if not team_doc:
                 await prompts.error_embed(self, ctx, "Couldn't find that team... (Try using quotes?)")
                 return None
@@ -332,7 +332,7 @@ class UserStatsCommands(commands.Cog):
                 await prompts.error_embed(self, ctx, "I need a team name (or set your team with `setuser`)!")
                 return None
             else:
-                team_doc = await db_get.get_team_document(team_name)
+                team_doc = await db_get.get_team_document(team_name, profile="embed")
         stat = team_doc["cached"]
 
         #mods
@@ -348,7 +348,7 @@ class UserStatsCommands(commands.Cog):
                         f"{comma_sep(mod_stat['average_score'])} avg. score, {percentage(mod_stat['average_acc'])} avg. acc\n\n")
             mod_string += text
 
-        player_names = [(await db_get.get_player_document(player))["user_name"] for player in team_doc["players"]]
+        player_names = [player.user_name for player in await db_get.get_player_entries(team_doc["players"])]
 
         #raw unreadability
         msg =  (f"__Averages__\n"
@@ -391,7 +391,7 @@ class UserStatsCommands(commands.Cog):
         apply if `team`, `page`, or `mod` wasn't changed by this check."""
         team_name, page, mod = argparser(params)
         if team_name:
-            score_docs, page, max_page = await db_get.get_top_team_scores(team_name, page, mod)
+            score_docs, page, max_page = await db_get.get_top_team_scores(team_name, page, mod, profile="row")
             if score_docs is None and max_page is None:
                 await prompts.error_embed(self, ctx, "Couldn't find that team... (Try using quotes?)")
                 return None
@@ -404,7 +404,7 @@ class UserStatsCommands(commands.Cog):
                 await prompts.error_embed(self, ctx, "I need a team name (or set your team with `setuser`)!")
                 return None
             else:
-                score_docs, page, max_page = await db_get.get_top_team_scores(team_name, page, mod)
+                score_docs, page, max_page = await db_get.get_top_team_scores(team_name, page, mod, profile="row")
                 if max_page == 0:
                     await prompts.error_embed(self, ctx, "Your team doesn't seem to have scores yet.")
                     return None
@@ -427,7 +427,7 @@ class UserStatsCommands(commands.Cog):
         meta = map_doc["meta"]
         stat = map_doc["stats"]
         sr = f"{float(meta['star_rating']):,.2f}"
-        msg =  (f"{sr}★ - {meta['bpm']} BPM - {int(meta['drain_time'])//60}:{int(meta['drain_time'])%60} drain time\n\n"
+        msg =  (f"{sr}★ - {float(meta['bpm']):g} BPM - {int(meta['drain_time'])//60}:{int(meta['drain_time'])%60} drain time\n\n"
                 f"__Stats__\n"
                 f"**Picks:** {stat['picks']}\n"
                 f"**Bans:** {stat['bans']}\n"
@@ -456,7 +456,7 @@ class UserStatsCommands(commands.Cog):
         or > the maximum.
         - `pool` is shorthand pool notation (QF, GF, Ro32, etc). Ignored if
         map_id is a beatmap ID."""
-        score_docs, page, max_page = await db_get.get_top_map_scores(map_id, page, pool)
+        score_docs, page, max_page = await db_get.get_top_map_scores(map_id, page, pool, profile="row")
         if score_docs is None and max_page is None:
             await prompts.error_embed(self.bot, ctx, "That map couldn't be found!")
         elif max_page == 0:
@@ -483,7 +483,7 @@ class UserStatsCommands(commands.Cog):
                                       'The leaderboard category **must** come first in '
                                       'your command if you use it.')
             return None
-        score_docs, page, max_page = await db_get.get_top_tournament_scores(leaderboard_category, page, mod)
+        score_docs, page, max_page = await db_get.get_top_tournament_scores(leaderboard_category, page, mod, profile="row")
         await ctx.trigger_typing()
         image_object = await image_manip.make_server_best(score_docs, page, max_page, mod, leaderboard_category)
         await ctx.send(file=discord.File(fp=image_object, filename=f'server_best-{page}.png')) 
@@ -503,7 +503,7 @@ class UserStatsCommands(commands.Cog):
                                       'The leaderboard category **must** come first in '
                                       'your command if you use it.')
             return None
-        score_docs, page, max_page = await db_get.get_top_tournament_players(leaderboard_category, page)
+        score_docs, page, max_page = await db_get.get_top_tournament_players(leaderboard_category, page, profile="row")
         user_doc = await db_get.get_user_document(ctx.message.author.id)
         await ctx.trigger_typing()
         image_object = await image_manip.make_averagep_best(score_docs, page, max_page, leaderboard_category, user_doc)
@@ -524,7 +524,7 @@ class UserStatsCommands(commands.Cog):
                                       'The leaderboard category **must** come first in '
                                       'your command if you use it.')
             return None
-        score_docs, page, max_page = await db_get.get_top_tournament_teams(leaderboard_category, page)
+        score_docs, page, max_page = await db_get.get_top_tournament_teams(leaderboard_category, page, profile="row")
         user_doc = await db_get.get_user_document(ctx.message.author.id)
         await ctx.trigger_typing()
         image_object = await image_manip.make_averaget_best(score_docs, page, max_page, leaderboard_category, user_doc)
@@ -0,0 +1,133 @@
+"""Shared fixtures. The bot's modules live (flat) in src/, so that's put on the path."""
+import contextlib
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+@pytest.fixture
+def fake_osuapi_server():
+    """An async context manager that serves fake_osuapi.py on a free local port.
+
+    `async with fake_osuapi_server("--synthetic", "--latency", "0.1") as (url, server)` takes the
+    same arguments as the command line; `url` is the base url and `server` the `FakeOsuApi`."""
+    import fake_osuapi
+    from aiohttp import web
+
+    @contextlib.asynccontextmanager
+    async def serve(*argv):
+        server = fake_osuapi.FakeOsuApi(fake_osuapi.parse_args(list(argv)))
+        runner = web.AppRunner(server.make_app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            yield f"http://127.0.0.1:{port}", server
+        finally:
+            await runner.cleanup()
+    return serve
+
+@pytest.fixture
+def osuapi_client(monkeypatch):
+    """`osuapi` with fresh coalescing, breaker and stats state, short retry delays and no beatmap cache.
+
+    Point `osuapi.api_url` at a `fake_osuapi_server()` before making requests."""
+    import osuapi
+    import beatmap_cache
+    from singleflight import SingleFlight
+    from resilience import CircuitBreaker, EndpointStats
+
+    monkeypatch.setattr(osuapi, "flights", SingleFlight())
+    monkeypatch.setattr(osuapi, "breaker", CircuitBreaker())
+    monkeypatch.setattr(osuapi, "endpoint_stats", EndpointStats())
+    monkeypatch.setattr(osuapi, "retry_base_delay", 0.01)
+    monkeypatch.setattr(osuapi, "api_key", "test")
+    #the beatmap cache is backed by mongodb, which isn't needed to test the api client
+    async def cache_miss(diff_id):
+        return None
+    async def cache_put(diff_id, beatmap):
+        pass
+    monkeypatch.setattr(beatmap_cache, "get", cache_miss)
+    monkeypatch.setattr(beatmap_cache, "put", cache_put)
+    return osuapi
+
+class _FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, *args, **kwargs):
+        self.documents = self.documents.sort(*args, **kwargs)
+        return self
+
+    def skip(self, count):
+        self.documents = self.documents.skip(count)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents.limit(count)
+        return self
+
+    async def to_list(self, length):
+        return list(self.documents)[:length] if length else list(self.documents)
+
+class _FakeCollection:
+    """A mongomock collection with motor's async interface (only what db_manip and db_get use)."""
+    def __init__(self, collection):
+        self.collection = collection
+        self.full_name = collection.full_name
+
+    def find(self, *args, **kwargs):
+        return _FakeCursor(self.collection.find(*args, **kwargs))
+
+    def aggregate(self, pipeline, **kwargs):
+        return _FakeCursor(self.collection.aggregate(pipeline))
+
+    async def bulk_write(self, requests, ordered=True):
+        #mongomock's own bulk_write() doesn't work with every pymongo version, so each request
+        #is applied on its own, in order
+        matched = 0
+        for request in requests:
+            if type(request).__name__ == "ReplaceOne":
+                result = self.collection.replace_one(request._filter, request._doc, upsert=bool(request._upsert))
+            else:
+                result = self.collection.update_one(request._filter, request._doc, upsert=bool(request._upsert))
+            matched += result.matched_count
+        return types.SimpleNamespace(matched_count=matched)
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+class _FakeDatabase:
+    def __init__(self, database):
+        self.database = database
+
+    def __getitem__(self, name):
+        return _FakeCollection(self.database[name])
+
+class _FakeClient:
+    def __init__(self, client):
+        self.client = client
+
+    def __getitem__(self, name):
+        return _FakeDatabase(self.client[name])
+
+@pytest.fixture
+def fake_mongo(monkeypatch):
+    """A mongomock client behind motor's async interface, used as the client of db_manip and db_get.
+
+    Returns the (synchronous) `mongomock.MongoClient`, for setting up and checking documents."""
+    mongomock = pytest.importorskip("mongomock")
+    import db_get
+    import db_manip
+
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(db_manip, "client", _FakeClient(client))
+    monkeypatch.setattr(db_get, "client", _FakeClient(client))
+    return client
@@ -0,0 +1,51 @@
+"""The query shapes in db_indexes are all covered by an index.
+
+This needs a real mongod (explain output can't be faked), at the `mongodb_test_url` environment
+variable or mongodb://localhost:27017. It's skipped if there isn't one. Only throwaway
+`index_check_*` databases are touched."""
+import asyncio
+import os
+
+import motor.motor_asyncio
+import pymongo.errors
+import pytest
+
+import db_indexes
+
+mongodb_test_url = os.getenv("mongodb_test_url", "mongodb://localhost:27017")
+
+def run_with_mongod(func):
+    """Run `func(client)` against the test mongod, skipping the test if it isn't reachable."""
+    async def main():
+        client = motor.motor_asyncio.AsyncIOMotorClient(mongodb_test_url, serverSelectionTimeoutMS=1000)
+        try:
+            try:
+                await client.admin.command("ping")
+            except pymongo.errors.PyMongoError as e:
+                return e
+            return await func(client)
+        finally:
+            client.close()
+    result = asyncio.run(main())
+    if isinstance(result, pymongo.errors.PyMongoError):
+        pytest.skip(f"no mongod at {mongodb_test_url} ({result.__class__.__name__})")
+    return result
+
+def test_no_query_shape_scans_a_collection():
+    failed = run_with_mongod(db_indexes.check_queries)
+    assert failed == []
+
+def test_reconcile_is_idempotent():
+    async def reconcile_twice(client):
+        prefix = "index_check_reconcile_"
+        try:
+            await client[prefix+"mappools"]["meta"].insert_one({'_id': "QF", 'diff_ids': ["1"]})
+            first = await db_indexes.reconcile_indexes(client=client, prefix=prefix)
+            second = await db_indexes.reconcile_indexes(client=client, prefix=prefix)
+        finally:
+            for database_name in {database_name for database_name, _ in db_indexes.indexes}:
+                await client.drop_database(prefix+database_name)
+        return first, second
+    first, second = run_with_mongod(reconcile_twice)
+    expected = sum(len(keys_list) for keys_list in db_indexes.indexes.values())
+    assert (first, second) == (expected, 0)
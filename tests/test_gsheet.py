@@ -0,0 +1,67 @@
+"""Reading the tournament sheet from a saved batchGet response."""
+import asyncio
+import json
+import os
+import shutil
+import types
+
+import pytest
+
+import db_manip
+import gsheet
+
+fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+@pytest.fixture
+def sheet_fixtures(tmp_path, monkeypatch):
+    """A `gsheet_fixtures` directory holding a copy of fixtures/sample_sheet.json."""
+    shutil.copy(os.path.join(fixtures, "sample_sheet.json"), tmp_path)
+    monkeypatch.setattr(gsheet, "fixtures", str(tmp_path))
+    monkeypatch.setattr(gsheet, "record_fixtures", False)
+    return tmp_path
+
+def test_saved_sheet_is_parsed(sheet_fixtures):
+    data, path = gsheet.load_fixture("sample_sheet")
+    assert path == os.path.join(str(sheet_fixtures), "sample_sheet.json")
+
+    #meta rows are looked up by position, so the empty one is kept
+    assert [row.key for row in data["meta"]] == ["Full name", "Shorthand", "Icon", "", "Active pool"]
+    assert data["meta"][4].value == "QF"
+
+    #short rows are padded and empty rows are dropped
+    assert [row.match_id for row in data["matches"]] == ["59000001", "59000002", "59000003"]
+    assert data["matches"][0] == gsheet.MatchRow("59000001", "1000", "referee", "Quarterfinals", "NM1,HD1", "0,1")
+    assert data["matches"][1].bans == ""
+    assert data["matches"][1].ignore_indexes == ""
+
+    assert data["pools"][0] == gsheet.PoolRow("Quarterfinals, QF", "129891", "NM", "NM1")
+    assert data["pools"][2] == gsheet.PoolRow("END", "", "", "")
+
+    assert data["teams"][1] == gsheet.TeamRow("Team B", "player5", "player6", "player7", "")
+
+def test_missing_sheet_has_no_fixture(sheet_fixtures):
+    assert gsheet.load_fixture("another_sheet") == (None, None)
+
+def test_fixtures_are_only_written_when_recording(sheet_fixtures, monkeypatch):
+    with open(os.path.join(fixtures, "sample_sheet.json")) as fixture:
+        response = json.load(fixture)
+    monkeypatch.setattr(gsheet, "_batch_get", lambda creds, sheet_id: response)
+
+    data = asyncio.run(gsheet.get_sheet_data(None, "live_sheet"))
+    assert data == gsheet.load_fixture("sample_sheet")[0]
+    assert not os.path.exists(os.path.join(str(sheet_fixtures), "live_sheet.json"))
+
+    monkeypatch.setattr(gsheet, "record_fixtures", True)
+    #while recording, saved copies are never read back
+    assert gsheet.load_fixture("sample_sheet") == (None, None)
+    asyncio.run(gsheet.get_sheet_data(None, "live_sheet"))
+    monkeypatch.setattr(gsheet, "record_fixtures", False)
+    assert gsheet.load_fixture("live_sheet")[0] == data
+
+def test_rebuild_says_when_a_fixture_is_used(sheet_fixtures):
+    sent = []
+    async def send(msg):
+        sent.append(msg)
+    data = asyncio.run(db_manip.get_all_gsheet_data(None, types.SimpleNamespace(send=send), "sample_sheet"))
+    assert data == gsheet.load_fixture("sample_sheet")[0]
+    assert len(sent) == 1 and "saved copy" in sent[0]
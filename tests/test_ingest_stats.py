@@ -0,0 +1,129 @@
+"""Player, team and map stats can be applied again after an interrupted `add_scores()`."""
+import asyncio
+import collections
+import types
+
+import db_get
+import db_manip
+import osuapi
+
+teams = {"Team A": ["1", "2"], "Team B": ["3", "4"]}
+
+def make_scores(match_id, diff_ids):
+    """Score documents for `teams` playing `diff_ids` in `match_id`."""
+    scores = []
+    for index, diff_id in enumerate(diff_ids):
+        for team, (team_name, player_ids) in enumerate(teams.items(), start=1):
+            for player_id in player_ids:
+                score = 100000*int(player_id)+1000*index+int(match_id)
+                scores.append({
+                    "_id": f"{player_id}-{match_id}-{index}",
+                    "user_id": player_id,
+                    "user_name": f"player{player_id}",
+                    "score": score,
+                    "accuracy": 0.9+int(player_id)/100,
+                    "contrib": 0.5,
+                    "score_difference": 1000 if team == 1 else -1000,
+                    "hits": {"300_count": 500, "100_count": 10, "50_count": 1, "miss_count": int(player_id)},
+                    "map_type": "NM" if index == 0 else "HD",
+                    "diff_id": diff_id,
+                    "match_id": match_id,
+                    "match_name": f"STK: (Team A) vs (Team B) #{match_id}",
+                    "match_index": index,
+                    "pool": "QF",
+                    "team": str(team),
+                    "team_name": team_name
+                })
+    return scores
+
+def setup(client):
+    for team_name, player_ids in teams.items():
+        client["players_and_teams"]["teams"].insert_one({"_id": team_name, "players": player_ids, "scores": []})
+        for player_id in player_ids:
+            client["players_and_teams"]["players"].insert_one({"_id": player_id, "team_name": team_name, "scores": []})
+    for diff_id in ["10", "20"]:
+        client["mappools"]["QF"].insert_one({"_id": diff_id, "scores": [], "banned_in": [], "stats": {
+            "picks": 0, "bans": 0, "total_scores": 0, "average_score": 0.0, "average_acc": 0.0, "one_mils": 0
+        }})
+
+def update_stats(scores, bans):
+    """Run every stats update on `scores`, like `add_scores()` does. `bans` is `{match_id: [diff_id, ...]}`."""
+    player_documents = collections.defaultdict(list)
+    team_documents = collections.defaultdict(list)
+    map_documents = collections.defaultdict(list)
+    ban_documents = collections.defaultdict(lambda: collections.defaultdict(int))
+    for score in scores:
+        player_documents[score["user_id"]].append(score)
+        team_documents[score["team_name"]].append(score)
+        map_documents[score["diff_id"]].append(score)
+    for match_id, diff_ids in bans.items():
+        for diff_id in diff_ids:
+            ban_documents[diff_id][match_id] += 1
+    async def main():
+        await db_manip.update_player_stats(player_documents)
+        await db_manip.update_team_stats(team_documents)
+        await db_manip.update_map_stats(map_documents, ban_documents)
+    asyncio.run(main())
+
+def dump(client):
+    return {name: list(client[database][name].find(sort=[("_id", 1)]))
+            for database, name in [("players_and_teams", "players"), ("players_and_teams", "teams"), ("mappools", "QF")]}
+
+def test_resumed_batch_only_applies_new_matches(fake_mongo):
+    first = make_scores("1", ["10"])
+    second = make_scores("2", ["10", "20"])
+    bans = {"1": ["20"], "2": ["10"]}
+
+    #the first match was applied before an interruption, and then the whole batch is run again
+    setup(fake_mongo)
+    update_stats(first, {"1": bans["1"]})
+    update_stats(first+second, bans)
+    resumed = dump(fake_mongo)
+
+    #...which should be the same as running it once
+    fake_mongo.drop_database("players_and_teams")
+    fake_mongo.drop_database("mappools")
+    setup(fake_mongo)
+    update_stats(first+second, bans)
+    assert resumed == dump(fake_mongo)
+
+    player = fake_mongo["players_and_teams"]["players"].find_one({"_id": "1"})
+    assert player["cached"]["maps_played"] == 3
+    assert player["scores"] == ["1-1-0", "1-2-0", "1-2-1"]
+    team = fake_mongo["players_and_teams"]["teams"].find_one({"_id": "Team A"})
+    assert team["cached"]["maps_played"] == 3
+    assert team["cached"]["total_scores"] == 6
+    maps = {map_document["_id"]: map_document for map_document in fake_mongo["mappools"]["QF"].find()}
+    assert maps["10"]["stats"]["picks"] == 2
+    assert maps["10"]["stats"]["total_scores"] == 8
+    assert maps["10"]["stats"]["bans"] == 1
+    #the first match's ban of 20 wasn't counted the first time around, since 20 wasn't played in it
+    assert maps["20"]["stats"]["bans"] == 1
+    assert maps["20"]["banned_in"] == ["1"]
+
+def test_applying_a_batch_twice_changes_nothing(fake_mongo):
+    scores = make_scores("1", ["10", "20"])+make_scores("2", ["20"])
+    bans = {"1": ["10"], "2": ["10"]}
+    setup(fake_mongo)
+    update_stats(scores, bans)
+    before = dump(fake_mongo)
+    update_stats(scores, bans)
+    assert dump(fake_mongo) == before
+    assert before["QF"][0]["stats"]["bans"] == 2
+
+def test_match_without_pooled_games_is_not_added(fake_mongo, monkeypatch):
+    async def get_match_data(match_id, priority):
+        return types.SimpleNamespace(games=["warmup"])
+    async def process_full_match(match_id, **kwargs):
+        return [{"diff_id": "99"}]
+    async def determine_pool(diff_id):
+        return None
+    monkeypatch.setattr(osuapi, "get_match_data", get_match_data)
+    monkeypatch.setattr(osuapi, "process_full_match", process_full_match)
+    monkeypatch.setattr(db_get, "determine_pool", determine_pool)
+    #so it's never journaled, and a later run doesn't get stuck resuming it
+    assert asyncio.run(db_manip._fetch_match(["1", "", "", "Finals", "", ""], {})) is None
+
+def test_match_without_scores_creates_no_match_document(fake_mongo):
+    asyncio.run(db_manip.create_match_stats({"1": [], "2": make_scores("2", ["10"])}))
+    assert [match["_id"] for match in fake_mongo["matches_and_scores"]["matches"].find()] == ["2"]
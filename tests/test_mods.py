@@ -0,0 +1,28 @@
+"""`osuapi.Mods.to_list()` gives the same names on every Python version."""
+import osuapi
+
+#what the original str()-based to_list() returned on python 3.8
+old_output = {
+    0: ["NM"],
+    1: ["NF"],
+    2: ["EZ"],
+    8: ["HD"],
+    16: ["HR"],
+    64: ["DT"],
+    256: ["HT"],
+    576: ["NC", "DT"],
+    1024: ["FL"],
+    9: ["HD", "NF"],
+    24: ["HR", "HD"],
+    72: ["DT", "HD"],
+    80: ["DT", "HR"],
+    88: ["DT", "HR", "HD"],
+    584: ["NC", "DT", "HD"],
+    1048: ["FL", "HR", "HD"],
+    16416: ["PF", "SD"],
+    536870912: ["V2"],
+    536870920: ["V2", "HD"],
+}
+
+def test_to_list_matches_the_old_output():
+    assert {value: osuapi.Mods(value).to_list() for value in old_output} == old_output
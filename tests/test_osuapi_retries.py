@@ -0,0 +1,54 @@
+"""Which osu! API failures are retried."""
+import asyncio
+import time
+
+import osuapi
+
+async def fetch_stats(url):
+    session = await osuapi.get_session()
+    async with session.get(f"{url}/stats") as resp:
+        return await resp.json()
+
+def run_against_fake(fake_osuapi_server, osuapi_client, monkeypatch, argv, call):
+    """Run `call()` against a fake api started with `argv`. Returns (result or exception, seconds taken, server stats)."""
+    async def main():
+        async with fake_osuapi_server(*argv) as (url, server):
+            monkeypatch.setattr(osuapi_client, "api_url", f"{url}/api")
+            try:
+                start = time.monotonic()
+                try:
+                    result = await call()
+                except Exception as e:
+                    result = e
+                elapsed = time.monotonic()-start
+                stats = await fetch_stats(url)
+            finally:
+                await osuapi_client.close_session()
+        return result, elapsed, stats
+    return asyncio.run(main())
+
+def test_unknown_user_is_not_retried_for_users(fake_osuapi_server, osuapi_client, monkeypatch):
+    monkeypatch.setattr(osuapi_client, "retry_base_delay", 1.0)
+    #no --synthetic, so every user comes back empty like a typo would
+    result, elapsed, stats = run_against_fake(fake_osuapi_server, osuapi_client, monkeypatch, [],
+                                              lambda: osuapi_client.get_player_data("not a real player"))
+    assert isinstance(result, osuapi.EmptyResponseError)
+    assert stats["requests"] == 1
+    assert elapsed < 1.0
+
+def test_empty_responses_are_retried_for_bulk_work(fake_osuapi_server, osuapi_client, monkeypatch):
+    monkeypatch.setattr(osuapi_client, "retry_attempts", 3)
+    result, elapsed, stats = run_against_fake(
+        fake_osuapi_server, osuapi_client, monkeypatch, [],
+        lambda: osuapi_client.get_player_data("not a real player", priority=osuapi.PRIORITY_BULK))
+    assert isinstance(result, osuapi.EmptyResponseError)
+    assert stats["requests"] == 3
+
+def test_server_errors_are_retried_for_users(fake_osuapi_server, osuapi_client, monkeypatch):
+    monkeypatch.setattr(osuapi_client, "retry_attempts", 3)
+    result, elapsed, stats = run_against_fake(fake_osuapi_server, osuapi_client, monkeypatch,
+                                              ["--synthetic", "--error-rate", "1"],
+                                              lambda: osuapi_client.get_player_data("1234"))
+    assert isinstance(result, osuapi.OsuApiError)
+    assert not isinstance(result, osuapi.EmptyResponseError)
+    assert stats["requests"] == 3
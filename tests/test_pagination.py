@@ -0,0 +1,33 @@
+"""Leaderboard pages come out in the same order however they're reached."""
+import asyncio
+
+import db_get
+
+import pytest
+
+@pytest.fixture
+def scores(fake_mongo, monkeypatch):
+    monkeypatch.setattr(db_get, "_page_bookmarks", {})
+    collection = fake_mongo["matches_and_scores"]["scores"]
+    #plenty of ties, so that pages have to be split on _id
+    collection.insert_many([{"_id": f"{i:02}", "user_id": "1", "score": (i*7) % 5} for i in range(35)])
+    expected = sorted(collection.find(), key=lambda score: (score["score"], score["_id"]), reverse=True)
+    return db_get.client["matches_and_scores"]["scores"], [score["_id"] for score in expected]
+
+def get_page(collection, page):
+    documents, page = asyncio.run(db_get._get_page(collection, {'user_id': "1"}, "score", page))
+    return [document["_id"] for document in documents]
+
+def test_paging_forward_matches_the_full_sort(scores):
+    collection, expected = scores
+    pages = [get_page(collection, page) for page in range(1, 5)]
+    assert sum(pages, []) == expected
+    #every full page left a bookmark for the one after it
+    assert sorted(list(db_get._page_bookmarks.values())[0]) == [2, 3, 4]
+
+def test_jumping_to_a_page_matches_paging_to_it(scores):
+    collection, expected = scores
+    #skips the whole way, then seeks from the bookmark page 3 left
+    assert get_page(collection, 3) == expected[20:30]
+    assert get_page(collection, 4) == expected[30:]
+    assert get_page(collection, 1) == expected[:10]
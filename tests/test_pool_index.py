@@ -0,0 +1,92 @@
+"""The in-memory pool index never keeps data from before the pools changed."""
+import asyncio
+
+import db_get
+from singleflight import SingleFlight
+
+import pytest
+
+@pytest.fixture
+def pool_index(fake_mongo, monkeypatch):
+    """Fresh pool index state; returns the (synchronous) `mappools.meta` collection."""
+    monkeypatch.setattr(db_get, "_pool_index", None)
+    monkeypatch.setattr(db_get, "_pool_generation", 0)
+    monkeypatch.setattr(db_get, "_pool_flights", SingleFlight())
+    db_get._pool_misses.clear()
+    return fake_mongo["mappools"]["meta"]
+
+async def settle():
+    """Let every task that's ready run until it blocks."""
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+def slow_meta_reads(monkeypatch):
+    """Make every read of `mappools.meta` wait until the returned event is set."""
+    release = asyncio.Event()
+    meta_collection = db_get.client["mappools"]["meta"]
+    find = meta_collection.find
+    class Collection:
+        def find(self, *args, **kwargs):
+            cursor = find(*args, **kwargs)
+            to_list = cursor.to_list
+            async def slow_to_list(length):
+                documents = await to_list(length)
+                await release.wait()
+                return documents
+            cursor.to_list = slow_to_list
+            return cursor
+
+        def __getattr__(self, name):
+            return getattr(meta_collection, name)
+    class Database:
+        def __getitem__(self, name):
+            return Collection()
+    class Client:
+        def __getitem__(self, name):
+            return Database()
+    monkeypatch.setattr(db_get, "client", Client())
+    return release
+
+def test_load_during_invalidation_is_not_kept(pool_index, monkeypatch):
+    pool_index.insert_one({"_id": "QF", "diff_ids": ["1"]})
+    async def main():
+        release = slow_meta_reads(monkeypatch)
+        cold_start = asyncio.ensure_future(db_get.determine_pool("1"))
+        await settle()
+        #the pools are rebuilt while the cold start is still loading
+        pool_index.delete_many({})
+        pool_index.insert_one({"_id": "SF", "diff_ids": ["1"]})
+        db_get.invalidate_pool_index()
+        release.set()
+        assert await cold_start == "QF"
+        assert db_get._pool_index is None
+        assert await db_get.determine_pool("1") == "SF"
+    asyncio.run(main())
+
+def test_refresh_does_not_join_an_older_load(pool_index, monkeypatch):
+    pool_index.insert_one({"_id": "QF", "diff_ids": ["1"]})
+    async def main():
+        release = slow_meta_reads(monkeypatch)
+        cold_start = asyncio.ensure_future(db_get.determine_pool("1"))
+        await settle()
+        #add_pools() inserts a pool and refreshes while the cold start is still loading
+        pool_index.insert_one({"_id": "SF", "diff_ids": ["2"]})
+        refresh = asyncio.ensure_future(db_get.refresh_pool_index())
+        await settle()
+        release.set()
+        await asyncio.gather(cold_start, refresh)
+        assert db_get._pool_index == {"1": "QF", "2": "SF"}
+    asyncio.run(main())
+
+def test_misses_are_bounded_and_expire(pool_index, monkeypatch):
+    pool_index.insert_one({"_id": "QF", "diff_ids": ["1"]})
+    assert db_get._pool_misses.maxsize > 0
+    async def main():
+        assert await db_get.determine_pool("2") is None
+        assert "2" in db_get._pool_misses
+        #the pool is changed by something other than the bot
+        pool_index.update_one({"_id": "QF"}, {'$push': {'diff_ids': "2"}})
+        assert await db_get.determine_pool("2") is None
+        db_get._pool_misses.expire(db_get._pool_misses.timer()+db_get._pool_misses.ttl+1)
+        assert await db_get.determine_pool("2") == "QF"
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""Identical concurrent osu! API requests should share one upstream request."""
+import asyncio
+
+import pytest
+
+import osuapi
+from singleflight import SingleFlight
+
+async def fetch_stats(url):
+    session = await osuapi.get_session()
+    async with session.get(f"{url}/stats") as resp:
+        return await resp.json()
+
+def test_concurrent_identical_calls_make_one_request(fake_osuapi_server, osuapi_client, monkeypatch):
+    async def main():
+        async with fake_osuapi_server("--synthetic", "--latency", "0.2") as (url, server):
+            monkeypatch.setattr(osuapi_client, "api_url", f"{url}/api")
+            try:
+                results = await asyncio.gather(*[osuapi_client.get_map_data("1001") for _ in range(20)])
+                stats = await fetch_stats(url)
+            finally:
+                await osuapi_client.close_session()
+        return results, stats
+    results, stats = asyncio.run(main())
+
+    assert stats["requests"] == 1
+    assert all(result is results[0] for result in results)
+    assert results[0].beatmap_id == "1001"
+    assert osuapi_client.flights.get_stats() == {"calls": 20, "coalesced": 19, "in_flight": 0}
+
+def test_leader_failure_reaches_every_waiter(fake_osuapi_server, osuapi_client, monkeypatch):
+    async def main():
+        async with fake_osuapi_server("--synthetic", "--latency", "0.2", "--error-rate", "1") as (url, server):
+            monkeypatch.setattr(osuapi_client, "api_url", f"{url}/api")
+            monkeypatch.setattr(osuapi_client, "retry_attempts", 1)
+            try:
+                results = await asyncio.gather(*[osuapi_client.get_map_data("1001") for _ in range(10)],
+                                               return_exceptions=True)
+                stats = await fetch_stats(url)
+            finally:
+                await osuapi_client.close_session()
+        return results, stats
+    results, stats = asyncio.run(main())
+
+    assert stats["requests"] == 1
+    assert all(isinstance(result, osuapi.OsuApiError) for result in results)
+    #everyone gets the leader's exception, not one of their own
+    assert all(result is results[0] for result in results)
+
+def test_next_call_after_failure_starts_a_new_flight():
+    flights = SingleFlight()
+    calls = []
+    async def fail():
+        calls.append("fail")
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+    async def succeed():
+        calls.append("succeed")
+        return "ok"
+    async def main():
+        results = await asyncio.gather(flights.run("key", fail), flights.run("key", fail), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        return await flights.run("key", succeed)
+
+    assert asyncio.run(main()) == "ok"
+    assert calls == ["fail", "succeed"]
+    assert flights.in_flight == 0